@@ -1,15 +1,19 @@
 """
 Flask application factory
+
+Flask, flask_cors and mongoengine are imported inside create_app so that
+importing the app package (e.g. from the Celery worker) stays cheap.
 """
-from flask import Flask, request
-from flask_cors import CORS
-from app.config import config_by_name
-from mongoengine import connect
 from app.utils.logging_config import logger, log_request
 
 
 def create_app(config_name='development'):
     """Create and configure the Flask application"""
+    from flask import Flask, request
+    from flask_cors import CORS
+    from mongoengine import connect
+    from app.config import config_by_name
+
     app = Flask(__name__)
 
     # Load configuration
@@ -18,15 +22,34 @@ def create_app(config_name='development'):
     logger.info(f"Starting Transaction Service with config: {config_name}")
 
     CORS(app)
+
+    # Slow query listener has to be registered before the client is created
+    from app.utils.profiling import init_slow_query_capture, init_request_profiling
+    if app.config.get('SLOW_QUERY_CAPTURE_ENABLED'):
+        init_slow_query_capture(app.config)
+
     connect(
     db=app.config.get('MONGODB_DB', 'devopsshowcase'),
     username=app.config.get('MONGODB_USER', 'appuser'),
     password=app.config.get('MONGODB_PASSWORD', 'apppassword'),
     host=app.config.get('MONGODB_HOST', 'localhost'),
     port=int(app.config.get('MONGODB_PORT', 27017)),
-    authentication_source=app.config.get('MONGODB_AUTH_SOURCE', 'devopsshowcase')
+    authentication_source=app.config.get('MONGODB_AUTH_SOURCE', 'devopsshowcase'),
+    serverSelectionTimeoutMS=app.config.get('MONGODB_SERVER_SELECTION_TIMEOUT_MS', 2000),
+    connectTimeoutMS=app.config.get('MONGODB_CONNECT_TIMEOUT_MS', 2000),
+    socketTimeoutMS=app.config.get('MONGODB_SOCKET_TIMEOUT_MS', 5000),
+    # don't open sockets or start monitor threads until the first query
+    connect=False,
+    **({'replicaset': app.config['MONGODB_REPLICA_SET']} if app.config.get('MONGODB_REPLICA_SET') else {})
     )
-    logger.info(f"Connected to MongoDB: {app.config.get('MONGODB_HOST')}:{app.config.get('MONGODB_PORT')}/{app.config.get('MONGODB_DB')}")
+    logger.info(f"MongoDB client configured (connects on first use): {app.config.get('MONGODB_HOST')}:{app.config.get('MONGODB_PORT')}/{app.config.get('MONGODB_DB')}")
+
+    # Admission control runs first so shed requests cost as little as possible
+    from app.utils.rate_limiting import init_rate_limiting
+    init_rate_limiting(app)
+
+    if app.config.get('PROFILING_ENABLED'):
+        init_request_profiling(app)
 
     # Request logging middleware
     @app.before_request
@@ -38,10 +61,19 @@ def create_app(config_name='development'):
     app.register_blueprint(transaction_bp, url_prefix='/api/transactions')
     logger.info("Registered transaction routes at /api/transactions")
 
+    if app.config.get('PROFILING_ENABLED') or app.config.get('SLOW_QUERY_CAPTURE_ENABLED'):
+        from app.routes.debug_routes import debug_bp
+        app.register_blueprint(debug_bp, url_prefix='/api/debug')
+        logger.info("Registered debug routes at /api/debug")
+
     # Register error handlers
     from app.utils.error_handlers import register_error_handlers
     register_error_handlers(app)
 
+    # Register CLI commands
+    from app.cli import register_commands
+    register_commands(app)
+
     logger.info("Transaction Service initialized successfully")
     return app
 
@@ -0,0 +1,34 @@
+"""
+CLI commands for the transaction service
+"""
+import click
+from app.services.export_service import export_transactions, EXPORT_FORMATS
+
+
+def register_commands(app):
+    """Register CLI commands"""
+
+    @app.cli.command('export-transactions')
+    @click.option('--output-dir', default=lambda: app.config.get('EXPORT_DIR'), show_default='EXPORT_DIR', help='Directory for chunk files and checkpoint')
+    @click.option('--format', 'export_format', type=click.Choice(EXPORT_FORMATS), default='csv', show_default=True)
+    @click.option('--chunk-size', type=int, default=lambda: app.config.get('EXPORT_CHUNK_SIZE'), help='Rows per output file')
+    @click.option('--batch-size', type=int, default=lambda: app.config.get('EXPORT_BATCH_SIZE'), help='Mongo cursor batch size')
+    @click.option('--start-date', type=click.DateTime(), default=None, help='Created at or after')
+    @click.option('--end-date', type=click.DateTime(), default=None, help='Created before')
+    @click.option('--status', 'statuses', multiple=True, type=click.Choice(['pending', 'completed', 'failed', 'refunded']))
+    @click.option('--no-resume', is_flag=True, help='Ignore an existing checkpoint')
+    def export_transactions_command(output_dir, export_format, chunk_size, batch_size, start_date, end_date, statuses, no_resume):
+        """Stream the transactions ledger to CSV/Parquet files"""
+        result = export_transactions(
+            output_dir,
+            export_format=export_format,
+            chunk_size=chunk_size,
+            batch_size=batch_size,
+            start_date=start_date,
+            end_date=end_date,
+            statuses=list(statuses) or None,
+            resume=not no_resume
+        )
+        if not result["ok"]:
+            raise click.ClickException(result["message"])
+        click.echo(result["message"])
@@ -2,9 +2,41 @@
 Configuration settings for different environments
 """
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+
+def _find_dotenv():
+    """Look for a .env file from this package up to the filesystem root"""
+    path = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        candidate = os.path.join(path, '.env')
+        if os.path.isfile(candidate):
+            return candidate
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+# containers get their settings from the environment, only pay for
+# python-dotenv when there actually is a .env file to load
+_dotenv_path = _find_dotenv()
+if _dotenv_path:
+    from dotenv import load_dotenv
+    load_dotenv(_dotenv_path)
+
+
+def clamp_max_staleness(seconds):
+    """
+    Make a max staleness value acceptable to the driver.
+
+    pymongo only takes -1 (no bound) or at least 90 seconds and would fail on
+    the first secondary read otherwise: negative values mean no bound, values
+    under 90 are raised to 90.
+    """
+    seconds = int(seconds)
+    if seconds < 0:
+        return -1
+    return max(seconds, 90)
 
 class Config:
     """Base configuration"""
@@ -17,6 +49,74 @@ class Config:
     MONGODB_USER=os.getenv('MONGODB_USERNAME')
     MONGODB_PASSWORD=os.getenv('MONGODB_PASSWORD')
     MONGODB_AUTH_SOURCE=os.getenv('MONGODB_AUTH_SOURCE', 'devopsshowcase')
+    MONGODB_REPLICA_SET=os.getenv('MONGODB_REPLICA_SET')
+
+    # Driver timeouts (ms), keep them well under the request budget
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS=int(os.getenv('MONGODB_SERVER_SELECTION_TIMEOUT_MS', 2000))
+    MONGODB_CONNECT_TIMEOUT_MS=int(os.getenv('MONGODB_CONNECT_TIMEOUT_MS', 2000))
+    MONGODB_SOCKET_TIMEOUT_MS=int(os.getenv('MONGODB_SOCKET_TIMEOUT_MS', 5000))
+
+    # Circuit breakers and request time budget (seconds)
+    REQUEST_TIME_BUDGET = float(os.getenv('REQUEST_TIME_BUDGET', 5))
+    MONGO_BREAKER_FAILURE_THRESHOLD = int(os.getenv('MONGO_BREAKER_FAILURE_THRESHOLD', 5))
+    MONGO_BREAKER_RESET_TIMEOUT = float(os.getenv('MONGO_BREAKER_RESET_TIMEOUT', 15))
+    BROKER_BREAKER_FAILURE_THRESHOLD = int(os.getenv('BROKER_BREAKER_FAILURE_THRESHOLD', 3))
+    BROKER_BREAKER_RESET_TIMEOUT = float(os.getenv('BROKER_BREAKER_RESET_TIMEOUT', 15))
+    BROKER_PUBLISH_TIMEOUT = float(os.getenv('BROKER_PUBLISH_TIMEOUT', 1))
+    # pending cart events younger than this are left to the request that is
+    # still publishing them, also how long a retry claims an event
+    PENDING_EVENT_GRACE_SECONDS = float(os.getenv('PENDING_EVENT_GRACE_SECONDS', 60))
+
+    # Read routing (per operation read preference)
+    # Reads that have to see the result of updateStatus stay on the primary,
+    # list/history reads can be served by secondaries.
+    MONGODB_MAX_STALENESS_SECONDS=clamp_max_staleness(os.getenv('MONGODB_MAX_STALENESS_SECONDS', 90))
+    # hedged reads are deprecated since MongoDB 8.0 (PyMongo warns, removed in PyMongo 5),
+    # only turn this on for older sharded clusters
+    MONGODB_HEDGED_READS=os.getenv('MONGODB_HEDGED_READS', 'false').lower() == 'true'
+    MONGODB_READ_ROUTING = {
+        'list': os.getenv('MONGODB_READ_LIST', 'secondaryPreferred'),
+        'history': os.getenv('MONGODB_READ_HISTORY', 'secondaryPreferred'),
+        'stats': os.getenv('MONGODB_READ_STATS', 'secondaryPreferred'),
+        'detail': os.getenv('MONGODB_READ_DETAIL', 'primary'),
+        'export': os.getenv('MONGODB_READ_EXPORT', 'secondaryPreferred'),
+    }
+
+    # Ledger export
+    EXPORT_DIR = os.getenv('EXPORT_DIR', 'exports')
+    EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 100000))
+    EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+
+    # Admission control / rate limiting
+    # limits are (tokens per second, burst) per client per route
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+    RATE_LIMIT_REDIS_URL = os.getenv('RATE_LIMIT_REDIS_URL', f"redis://{os.getenv('CELERY_BROKER_HOST', 'localhost')}:{os.getenv('CELERY_BROKER_PORT', 6379)}/1")
+    RATE_LIMIT_DEFAULT = (50, 100)
+    RATE_LIMITS = {
+        'POST /api/transactions/': (5, 10),
+        'PUT /api/transactions/<transaction_id>': (5, 10),
+        'DELETE /api/transactions/<transaction_id>': (5, 10),
+    }
+    MAX_IN_FLIGHT_REQUESTS = int(os.getenv('MAX_IN_FLIGHT_REQUESTS', 64))
+    SHED_RETRY_AFTER = 1
+
+    # Profiling and slow query capture
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0.0))
+    PROFILING_TOKEN = os.getenv('PROFILING_TOKEN')
+    PROFILING_DIR = os.getenv('PROFILING_DIR', 'profiles')
+    SLOW_QUERY_CAPTURE_ENABLED = os.getenv('SLOW_QUERY_CAPTURE_ENABLED', 'false').lower() == 'true'
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 100))
+    SLOW_QUERY_BUFFER_SIZE = int(os.getenv('SLOW_QUERY_BUFFER_SIZE', 200))
+
+    # Currencies and FX rates
+    # rates are base currency units per one unit of a currency
+    BASE_CURRENCY = os.getenv('BASE_CURRENCY', 'USD')
+    FX_RATES_FILE = os.getenv('FX_RATES_FILE', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'fx_rates.json'))
+    FX_RATES_TTL = int(os.getenv('FX_RATES_TTL', 300))
+    FX_RATES_URL = os.getenv('FX_RATES_URL')
+    FX_RATES_REFRESH_INTERVAL = int(os.getenv('FX_RATES_REFRESH_INTERVAL', 3600))
 
     # Security
     SESSION_COOKIE_SECURE = True
@@ -38,6 +138,7 @@ class TestingConfig(Config):
     """Testing configuration"""
     DEBUG = True
     TESTING = True
+    RATE_LIMIT_ENABLED = False
 
 config_by_name = {
     'development': DevelopmentConfig,
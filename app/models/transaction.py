@@ -2,7 +2,7 @@
 Transaction model for managing transactions
 """
 from typing import Any
-from mongoengine import Document, StringField, DateTimeField, LazyReferenceField, FloatField
+from mongoengine import Document, StringField, DateTimeField, LazyReferenceField, FloatField, IntField
 from datetime import datetime,timezone
 
 
@@ -15,12 +15,30 @@ class Transaction(Document):
     # The event processor will pass the cart_id when creating a transaction
     # nah just keeping normal id and i'll add it
     cart_id = StringField(required=True)
+    # transaction_value is kept for existing clients, amount_minor is the exact amount
     transaction_value = FloatField(required=True, min_value=0)
-    currency = StringField(default="dollar")
+    currency = StringField(default="USD")
+    # integer minor units (cents...) of currency, and the same amount in the
+    # base currency at the FX rate used at creation time, so totals can sum
+    # base_amount_minor directly
+    amount_minor = IntField(min_value=0)
+    base_currency = StringField()
+    base_amount_minor = IntField(min_value=0)
+    fx_rate = StringField()
     created_at = DateTimeField(default=datetime.now(timezone.utc))
     updated_at = DateTimeField(default=datetime.now(timezone.utc))
     status = StringField(default="pending", choices=["pending", "completed", "failed", "refunded"])
+    # cart event saved with the status change, cleared once published;
+    # pending_event_at is when it was stored or last claimed for a retry
+    pending_event = StringField()
+    pending_event_at = DateTimeField()
 
+    meta = {
+        'indexes': [
+            ('status', 'base_amount_minor'),
+            {'fields': ['pending_event_at'], 'sparse': True}
+        ]
+    }
 
     def to_dict(self):
         """Convert to dictionary"""
@@ -29,6 +47,10 @@ class Transaction(Document):
             'cart_id': self.cart_id,
             'transaction_value': self.transaction_value,
             'currency': self.currency,
+            'amount_minor': self.amount_minor,
+            'base_currency': self.base_currency,
+            'base_amount_minor': self.base_amount_minor,
+            'fx_rate': self.fx_rate,
             'created_at': self.created_at.isoformat() if isinstance(self.created_at, datetime) else None,
             'updated_at': self.updated_at.isoformat() if isinstance(self.updated_at, datetime) else None,
             'status': self.status
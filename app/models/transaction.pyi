@@ -30,9 +30,15 @@ class Transaction:
     cart_id :str
     transaction_value :float
     currency = str
+    amount_minor: int | None
+    base_currency: str | None
+    base_amount_minor: int | None
+    fx_rate: str | None
     created_at :datetime
     updated_at:datetime
     status :str
+    pending_event: str | None
+    pending_event_at: datetime | None
     # Class-level attributes injected by mongoengine
     objects: ClassVar[QuerySet["Transaction"]]
 
@@ -44,6 +50,10 @@ class Transaction:
         created_at: datetime | None = ...,
         updated_at: datetime | None = ...,
         transaction_value: float | None = ...,
+        amount_minor: int | None = ...,
+        base_currency: str | None = ...,
+        base_amount_minor: int | None = ...,
+        fx_rate: str | None = ...,
     ) -> None: ...
 
     def get_total(self) -> float: ...
@@ -2,5 +2,6 @@
 Routes package initialization
 """
 from app.routes.transaction_routes import transaction_bp
+from app.routes.debug_routes import debug_bp
 
-__all__ = ['transaction_bp']
+__all__ = ['transaction_bp', 'debug_bp']
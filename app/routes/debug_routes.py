@@ -0,0 +1,38 @@
+"""
+Debug routes, only reachable with the profiling token
+"""
+from flask import Blueprint, jsonify, current_app
+from app.utils import profiling
+
+debug_bp = Blueprint('debug', __name__)
+
+
+@debug_bp.before_request
+def require_token():
+    if not profiling.is_privileged(current_app):
+        return jsonify({
+            'success': False,
+            'message': 'Forbidden'
+        }), 403
+
+
+@debug_bp.route('/slow-queries', methods=['GET'])
+def get_slow_queries():
+    """Get the recorded slow mongo commands, slowest first"""
+    recorder = profiling.slow_query_recorder
+    return jsonify({
+        'success': True,
+        'threshold_ms': recorder.threshold_ms if recorder else None,
+        'slow_queries': recorder.entries() if recorder else []
+    }), 200
+
+
+@debug_bp.route('/slow-queries', methods=['DELETE'])
+def clear_slow_queries():
+    """Empty the slow query buffer"""
+    if profiling.slow_query_recorder:
+        profiling.slow_query_recorder.clear()
+    return jsonify({
+        'success': True,
+        'message': 'Slow query buffer cleared'
+    }), 200
@@ -1,7 +1,7 @@
 """
 Transaction routes for managing transactions
 """
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, current_app
 from app.services.transaction_service import (
     create_transaction,
     get_all_transactions,
@@ -9,16 +9,32 @@ from app.services.transaction_service import (
     get_transactions_by_cart,
     delete_transaction
 )
+from app.utils.resilience import start_deadline, clear_deadline
 
 transaction_bp = Blueprint('transaction', __name__)
 
 error_map = {
     "VALIDATION_ERROR": 400,
     "NOT_FOUND": 404,
-    "INVALID_CART": 400
+    "EVENT_PENDING": 409,
+    "INVALID_CART": 400,
+    "DEPENDENCY_UNAVAILABLE": 503,
+    "DEADLINE_EXCEEDED": 503,
+    "FX_RATE_UNAVAILABLE": 503
 }
 
 
+@transaction_bp.before_request
+def start_request_budget():
+    """Give every request a time budget, service calls fail fast once it is spent"""
+    start_deadline(current_app.config.get('REQUEST_TIME_BUDGET'))
+
+
+@transaction_bp.teardown_request
+def end_request_budget(exc):
+    clear_deadline()
+
+
 @transaction_bp.route('/', methods=['GET'])
 def get_transactions():
     """Get all transactions"""
@@ -33,7 +49,7 @@ def get_transactions():
         return jsonify({
             'success': False,
             'message': result['message']
-        }), 500
+        }), error_map.get(result.get("error", ""), 500)
 
 
 @transaction_bp.route('/<transaction_id>', methods=['GET'])
@@ -80,7 +96,7 @@ def add_transaction():
 
     cart_id = data.get("cart_id")
     transaction_value = data.get("transaction_value")
-    currency = data.get("currency", "dollar")
+    currency = data.get("currency", "USD")
 
     if not cart_id or transaction_value is None:
         return jsonify({
@@ -7,7 +7,8 @@ from app.services.transaction_service import (
     get_transaction_by_id,
     get_transactions_by_cart,
     delete_transaction,
-    updateStatus
+    updateStatus,
+    publish_pending_events
 )
 
 __all__ = [
@@ -16,5 +17,6 @@ __all__ = [
     'get_transaction_by_id',
     'get_transactions_by_cart',
     'delete_transaction',
-    'updateStatus'
+    'updateStatus',
+    'publish_pending_events'
 ]
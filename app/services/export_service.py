@@ -0,0 +1,242 @@
+"""
+Ledger export service
+
+Streams the transactions collection to CSV or Parquet files in fixed size
+chunks. The collection is walked in _id order with keyset pagination
+(_id > last exported _id) so every chunk is a fresh, bounded query, and
+rows are written as they come off the cursor (one cursor batch at a time
+for Parquet) so memory stays flat no matter how big the collection is.
+After each chunk a checkpoint file is written so an interrupted export can
+pick up where it stopped.
+"""
+import csv
+import glob
+import importlib.util
+import json
+import os
+from datetime import datetime
+from bson import ObjectId
+from app.models.transaction import Transaction
+from app.utils.logging_config import logger, log_error
+from app.utils.read_routing import read_preference_for
+
+EXPORT_FIELDS = ['id', 'cart_id', 'transaction_value', 'currency', 'amount_minor', 'base_currency',
+                 'base_amount_minor', 'fx_rate', 'created_at', 'updated_at', 'status']
+# parquet is only offered when pyarrow is installed, it is not in the base requirements
+EXPORT_FORMATS = ['csv'] + (['parquet'] if importlib.util.find_spec('pyarrow') else [])
+CHECKPOINT_FILE = 'checkpoint.json'
+
+
+def _build_query(start_date=None, end_date=None, statuses=None, after_id=None):
+    """Build the mongo filter for one export chunk"""
+    query = {}
+    if after_id:
+        query['_id'] = {'$gt': ObjectId(after_id)}
+    if start_date or end_date:
+        query['created_at'] = {}
+        if start_date:
+            query['created_at']['$gte'] = start_date
+        if end_date:
+            query['created_at']['$lt'] = end_date
+    if statuses:
+        query['status'] = {'$in': list(statuses)}
+    return query
+
+
+def _to_row(doc):
+    """Convert a raw mongo document to an export row"""
+    created_at = doc.get('created_at')
+    updated_at = doc.get('updated_at')
+    return {
+        'id': str(doc['_id']),
+        'cart_id': doc.get('cart_id'),
+        'transaction_value': doc.get('transaction_value'),
+        'currency': doc.get('currency'),
+        'amount_minor': doc.get('amount_minor'),
+        'base_currency': doc.get('base_currency'),
+        'base_amount_minor': doc.get('base_amount_minor'),
+        'fx_rate': doc.get('fx_rate'),
+        'created_at': created_at.isoformat() if isinstance(created_at, datetime) else None,
+        'updated_at': updated_at.isoformat() if isinstance(updated_at, datetime) else None,
+        'status': doc.get('status')
+    }
+
+
+def _write_csv(path, docs, batch_size):
+    """Stream documents to a CSV file, returns (row count, last _id)"""
+    count, last_id = 0, None
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+        for doc in docs:
+            row = _to_row(doc)
+            writer.writerow(row)
+            count, last_id = count + 1, row['id']
+    return count, last_id
+
+
+def _parquet_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ('id', pa.string()),
+        ('cart_id', pa.string()),
+        ('transaction_value', pa.float64()),
+        ('currency', pa.string()),
+        ('amount_minor', pa.int64()),
+        ('base_currency', pa.string()),
+        ('base_amount_minor', pa.int64()),
+        ('fx_rate', pa.string()),
+        ('created_at', pa.string()),
+        ('updated_at', pa.string()),
+        ('status', pa.string())
+    ])
+
+
+def _write_parquet(path, docs, batch_size):
+    """Write documents to a Parquet file one row group per batch, returns (row count, last _id)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = _parquet_schema()
+    count, last_id, batch = 0, None, []
+    with pq.ParquetWriter(path, schema) as writer:
+        for doc in docs:
+            batch.append(_to_row(doc))
+            if len(batch) >= batch_size:
+                writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+                count, last_id, batch = count + len(batch), batch[-1]['id'], []
+        if batch:
+            writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+            count, last_id = count + len(batch), batch[-1]['id']
+    return count, last_id
+
+
+def _clear_output(output_dir):
+    """Remove chunk files and checkpoint left by an earlier run"""
+    for path in glob.glob(os.path.join(output_dir, 'transactions-*')):
+        os.remove(path)
+    checkpoint_path = os.path.join(output_dir, CHECKPOINT_FILE)
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+
+def _read_checkpoint(output_dir):
+    path = os.path.join(output_dir, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_checkpoint(output_dir, checkpoint):
+    path = os.path.join(output_dir, CHECKPOINT_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    # atomic replace so a crash never leaves a half written checkpoint
+    os.replace(tmp_path, path)
+
+
+def export_transactions(output_dir, export_format='csv', chunk_size=100000, batch_size=1000,
+                        start_date=None, end_date=None, statuses=None, resume=True):
+    """
+    Export transactions to chunked CSV or Parquet files.
+
+    Args:
+        output_dir: Directory the chunk files and checkpoint are written to
+        export_format: csv or parquet
+        chunk_size: Number of rows per output file
+        batch_size: Cursor batch size used when reading from mongo
+        start_date: Only export transactions created at or after this datetime
+        end_date: Only export transactions created before this datetime
+        statuses: Only export transactions with one of these statuses
+        resume: Continue from the checkpoint in output_dir if there is one,
+            otherwise chunk files from earlier runs are deleted first
+    """
+    try:
+        if export_format == 'parquet' and 'parquet' not in EXPORT_FORMATS:
+            return {
+                "ok": False,
+                "error": "VALIDATION_ERROR",
+                "message": "Parquet exports need pyarrow installed (pip install pyarrow)"
+            }
+        if export_format not in EXPORT_FORMATS:
+            return {
+                "ok": False,
+                "error": "VALIDATION_ERROR",
+                "message": f"Invalid format. Must be one of: {', '.join(EXPORT_FORMATS)}"
+            }
+        if chunk_size <= 0 or batch_size <= 0:
+            return {
+                "ok": False,
+                "error": "VALIDATION_ERROR",
+                "message": "chunk_size and batch_size must be positive"
+            }
+
+        os.makedirs(output_dir, exist_ok=True)
+        filters = {
+            'format': export_format,
+            'start_date': start_date.isoformat() if start_date else None,
+            'end_date': end_date.isoformat() if end_date else None,
+            'statuses': sorted(statuses) if statuses else None
+        }
+
+        if not resume:
+            _clear_output(output_dir)
+        checkpoint = _read_checkpoint(output_dir) if resume else None
+        if checkpoint and checkpoint.get('filters') != filters:
+            return {
+                "ok": False,
+                "error": "VALIDATION_ERROR",
+                "message": "Checkpoint in output directory was written with different filters"
+            }
+        if not checkpoint:
+            checkpoint = {'filters': filters, 'last_id': None, 'chunks': 0, 'rows': 0, 'done': False}
+
+        if checkpoint['done']:
+            logger.info(f"Export already complete | output_dir={output_dir} | rows={checkpoint['rows']}")
+            return {
+                "ok": True,
+                "message": "Export already complete",
+                "rows": checkpoint['rows'],
+                "chunks": checkpoint['chunks']
+            }
+
+        logger.info(f"Starting export | output_dir={output_dir} | format={export_format} | resume_from={checkpoint['last_id']}")
+        collection = Transaction._get_collection().with_options(read_preference=read_preference_for('export'))
+        write_chunk = _write_csv if export_format == 'csv' else _write_parquet
+
+        while True:
+            query = _build_query(start_date, end_date, statuses, checkpoint['last_id'])
+            cursor = collection.find(query).sort('_id', 1).limit(chunk_size).batch_size(batch_size)
+
+            chunk_path = os.path.join(output_dir, f"transactions-{checkpoint['chunks']:05d}.{export_format}")
+            count, last_id = write_chunk(chunk_path, cursor, batch_size)
+            if not count:
+                os.remove(chunk_path)
+                break
+
+            checkpoint['last_id'] = last_id
+            checkpoint['chunks'] += 1
+            checkpoint['rows'] += count
+            _write_checkpoint(output_dir, checkpoint)
+            logger.info(f"Export chunk written | path={chunk_path} | rows={count} | total={checkpoint['rows']}")
+
+            if count < chunk_size:
+                break
+
+        checkpoint['done'] = True
+        _write_checkpoint(output_dir, checkpoint)
+        logger.info(f"Export complete | output_dir={output_dir} | rows={checkpoint['rows']} | chunks={checkpoint['chunks']}")
+
+        return {
+            "ok": True,
+            "message": f"Exported {checkpoint['rows']} transactions to {output_dir}",
+            "rows": checkpoint['rows'],
+            "chunks": checkpoint['chunks']
+        }
+    except Exception as err:
+        log_error("export_transactions", err, {"output_dir": output_dir})
+        return {
+            "ok": False,
+            "message": str(err)
+        }
@@ -0,0 +1,197 @@
+"""
+FX rate table
+
+Rates live in a local JSON file (FX_RATES_FILE) so transaction creation never
+waits on an external API and tests can run offline. The file is reloaded when
+it changes, at most every FX_RATES_TTL seconds. When FX_RATES_URL is set every
+process (web and worker) downloads a new table into its own copy of the file
+every FX_RATES_REFRESH_INTERVAL seconds.
+
+File format, rates are base currency units per one unit of the currency:
+    {"base": "USD", "as_of": "...", "rates": {"EUR": "1.0850", ...}}
+"""
+import json
+import os
+import threading
+import time
+from decimal import Decimal, InvalidOperation, ROUND_HALF_EVEN
+from app.config import Config
+from app.utils.currency import ISO_4217, CurrencyError, from_minor_units, normalize_currency
+from app.utils.logging_config import logger, log_error
+
+
+class FxRateUnavailable(Exception):
+    """Raised when no rate table could be loaded at all"""
+
+
+class FxRateTable:
+    """
+    Cached, file backed FX rate table.
+
+    A table that fails to load (missing file, bad JSON, wrong base, bad rate)
+    never replaces the last good one. When a url is given each process
+    downloads a new table into its own file every refresh_interval seconds,
+    in a background thread so requests never wait on it.
+    """
+
+    def __init__(self, path, base_currency='USD', ttl=300, url=None, refresh_interval=3600, clock=time.monotonic):
+        self.path = path
+        self.base_currency = base_currency
+        self.ttl = ttl
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.as_of = None
+        self._clock = clock
+        self._rates = {}
+        self._mtime = None
+        self._checked_at = None
+        self._refreshed_at = None
+        self._refreshing = False
+        self._reload = False
+        self._lock = threading.Lock()
+
+    def _load_if_stale(self):
+        now = self._clock()
+        if self._rates and not self._reload and now - self._checked_at < self.ttl:
+            return
+        with self._lock:
+            if self._rates and not self._reload and now - self._checked_at < self.ttl:
+                return
+            self._checked_at = now
+            # after a refresh the file is new even if its mtime looks the same
+            reload, self._reload = self._reload, False
+            self._maybe_refresh(now)
+            try:
+                mtime = os.path.getmtime(self.path)
+                if mtime == self._mtime and not reload:
+                    return
+                self._rates, self.as_of = _read_table(self.path, self.base_currency)
+                self._mtime = mtime
+            except (OSError, ValueError, InvalidOperation, CurrencyError, FxRateUnavailable) as err:
+                log_error("fx_rates", err, {"path": self.path})
+                if self._rates:
+                    # keep serving the last good table
+                    return
+                raise FxRateUnavailable(f"No usable FX rate table at {self.path}") from err
+            logger.info(f"FX rates loaded | path={self.path} | base={self.base_currency} | as_of={self.as_of} | currencies={len(self._rates)}")
+
+    def _maybe_refresh(self, now):
+        if not self.url or self._refreshing:
+            return
+        if self._refreshed_at is not None and now - self._refreshed_at < self.refresh_interval:
+            return
+        self._refreshing = True
+        self._refreshed_at = now
+        threading.Thread(target=self._refresh, name='fx-rates-refresh', daemon=True).start()
+
+    def _refresh(self):
+        try:
+            result = refresh_fx_rates(self.url, self.path, self.base_currency)
+            if result["ok"]:
+                # pick the new file up on the next lookup
+                self._reload = True
+        finally:
+            self._refreshing = False
+
+    def rate(self, currency):
+        """
+        Base currency units per one unit of currency.
+
+        Raises:
+            CurrencyError: the table has no rate for this currency
+            FxRateUnavailable: no rate table could be loaded
+        """
+        if currency == self.base_currency:
+            return Decimal(1)
+        self._load_if_stale()
+        rate = self._rates.get(currency)
+        if rate is None:
+            raise CurrencyError(f"No FX rate for {currency}")
+        return rate
+
+    def to_base_minor(self, amount_minor, currency):
+        """
+        Convert minor units of currency to minor units of the base currency.
+
+        Returns:
+            (base_amount_minor, rate)
+        """
+        rate = self.rate(currency)
+        base = (from_minor_units(amount_minor, currency) * rate).scaleb(ISO_4217[self.base_currency])
+        return int(base.quantize(Decimal(1), rounding=ROUND_HALF_EVEN)), rate
+
+
+def _read_table(path, base_currency):
+    with open(path) as f:
+        data = json.load(f)
+    _validate_table(data, base_currency)
+    rates = {normalize_currency(code): Decimal(str(rate)) for code, rate in data['rates'].items()}
+    return rates, data.get('as_of')
+
+
+def _validate_table(data, base_currency):
+    if not isinstance(data, dict):
+        raise FxRateUnavailable("FX table must be a JSON object")
+    if data.get('base') != base_currency:
+        raise FxRateUnavailable(f"FX table base is {data.get('base')}, expected {base_currency}")
+    rates = data.get('rates')
+    if not isinstance(rates, dict) or not rates:
+        raise FxRateUnavailable("FX table has no rates")
+    for code, rate in rates.items():
+        try:
+            value = Decimal(str(rate))
+        except InvalidOperation:
+            raise FxRateUnavailable(f"Invalid FX rate for {code}: {rate}")
+        if not value.is_finite() or value <= 0:
+            raise FxRateUnavailable(f"Invalid FX rate for {code}: {rate}")
+
+
+_table = None
+
+
+def get_fx_rates():
+    """Shared rate table built from the config"""
+    global _table
+    if _table is None:
+        _table = FxRateTable(Config.FX_RATES_FILE, Config.BASE_CURRENCY, Config.FX_RATES_TTL,
+                             Config.FX_RATES_URL, Config.FX_RATES_REFRESH_INTERVAL)
+    return _table
+
+
+def refresh_fx_rates(url=None, path=None, base_currency=None):
+    """
+    Download a rate table and atomically replace the local file.
+
+    The downloaded table has to be in the file format above, a bad download
+    never overwrites the last good file.
+    """
+    from urllib.request import urlopen
+    url = url or Config.FX_RATES_URL
+    path = path or Config.FX_RATES_FILE
+    base_currency = base_currency or Config.BASE_CURRENCY
+    try:
+        if not url:
+            return {
+                "ok": False,
+                "error": "VALIDATION_ERROR",
+                "message": "FX_RATES_URL is not configured"
+            }
+        with urlopen(url, timeout=10) as response:
+            data = json.load(response)
+        _validate_table(data, base_currency)
+
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+        logger.info(f"FX rates refreshed | path={path} | as_of={data.get('as_of')} | currencies={len(data['rates'])}")
+        return {
+            "ok": True,
+            "message": f"FX rates refreshed ({len(data['rates'])} currencies)"
+        }
+    except Exception as err:
+        log_error("refresh_fx_rates", err, {"url": url})
+        return {
+            "ok": False,
+            "message": str(err)
+        }
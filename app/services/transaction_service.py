@@ -1,36 +1,164 @@
 """
 Transaction service
 """
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from app.models.transaction import Transaction
 from mongoengine.errors import ValidationError
 from bson import ObjectId
 from app.utils.logging_config import logger, log_error, log_transaction_event, log_celery_task, log_db_operation
+from app.utils.read_routing import read_preference_for
+from app.utils.resilience import guarded_call, mongo_breaker, broker_breaker, DependencyUnavailable
+from app.config import Config
+from app.utils.currency import CurrencyError, normalize_currency, to_minor_units, from_minor_units
+from app.services.fx_rates import get_fx_rates, FxRateUnavailable
 
-from celery import Celery
 import os
-celery = Celery(
-    'transaction_service',
-    broker=f"redis://{os.getenv('CELERY_BROKER_HOST', 'localhost')}:{os.getenv('CELERY_BROKER_PORT', 6379)}/0"
-)
-celery.conf.task_routes = {
-    'transaction.*': {'queue': 'transaction_queue'},
-    'cart.*': {'queue': 'cart_queue'},
-    'stock.*': {'queue': 'stock_queue'},
+
+_celery = None
+
+
+def get_celery():
+    """Create the Celery client on first use, keeps celery/kombu/redis out of the import"""
+    global _celery
+    if _celery is None:
+        from celery import Celery
+        celery = Celery(
+            'transaction_service',
+            broker=f"redis://{os.getenv('CELERY_BROKER_HOST', 'localhost')}:{os.getenv('CELERY_BROKER_PORT', 6379)}/0"
+        )
+        celery.conf.task_routes = {
+            'transaction.*': {'queue': 'transaction_queue'},
+            'cart.*': {'queue': 'cart_queue'},
+            'stock.*': {'queue': 'stock_queue'},
+        }
+        # fail fast on a slow/unreachable broker instead of blocking the request
+        celery.conf.broker_connection_timeout = Config.BROKER_PUBLISH_TIMEOUT
+        celery.conf.broker_transport_options = {
+            'socket_timeout': Config.BROKER_PUBLISH_TIMEOUT,
+            'socket_connect_timeout': Config.BROKER_PUBLISH_TIMEOUT
+        }
+        _celery = celery
+    return _celery
+
+
+def _send_task(name, args):
+    """Publish a task through the broker circuit breaker, without publish retries"""
+    with guarded_call(broker_breaker):
+        get_celery().send_task(name, args=args, retry=False)
+
+
+# cart event sent for each status change
+status_events = {
+    "completed": "cart.completeCheckout",
+    "failed": "cart.unfreeze",
+    "refunded": "cart.processRefund",
 }
 
 
-def create_transaction(cart_id, transaction_value, currency="dollar"):
-    """Create a new transaction"""
+def _publish_pending_event(transaction):
+    """
+    Publish the transaction's pending cart event and clear it.
+
+    Returns False when the broker is unavailable, the event then stays on the
+    document and publish_pending_events sends it later.
+    """
+    event = transaction.pending_event
+    try:
+        _send_task(event, [transaction.cart_id])
+    except DependencyUnavailable as err:
+        log_error("publish_event", err, {"transaction_id": str(transaction.id), "event": event})
+        return False
+    log_celery_task(event, [transaction.cart_id], "SENT")
+    with guarded_call(mongo_breaker):
+        Transaction.objects(id=transaction.id, pending_event=event).update(unset__pending_event=True, unset__pending_event_at=True)
+    transaction.pending_event = None
+    transaction.pending_event_at = None
+    return True
+
+
+def _claim_pending_event():
+    """
+    Atomically take one pending event older than the grace period.
+
+    Events younger than that may still be published by the request that
+    stored them. Claiming moves pending_event_at forward, so other workers
+    skip the event until the grace period passes again.
+    """
+    now = datetime.now(timezone.utc)
+    with guarded_call(mongo_breaker):
+        return Transaction.objects(
+            pending_event__exists=True,
+            pending_event_at__lt=now - timedelta(seconds=Config.PENDING_EVENT_GRACE_SECONDS)
+        ).modify(set__pending_event_at=now, new=True)
+
+
+def publish_pending_events(limit=100):
+    """Retry cart events that could not be published when the status changed"""
+    try:
+        published = 0
+        while published < limit:
+            transaction = _claim_pending_event()
+            if transaction is None:
+                break
+            if not _publish_pending_event(transaction):
+                break
+            published += 1
+        logger.info(f"Pending events published | published={published}")
+        return {
+            "ok": True,
+            "message": f"Published {published} pending events",
+            "published": published
+        }
+    except DependencyUnavailable as err:
+        log_error("publish_pending_events", err)
+        return {
+            "ok": False,
+            "error": err.code,
+            "message": str(err)
+        }
+    except Exception as err:
+        log_error("publish_pending_events", err)
+        return {
+            "ok": False,
+            "message": str(err)
+        }
+
+
+def create_transaction(cart_id, transaction_value, currency="USD"):
+    """
+    Create a new transaction.
+
+    The amount is stored in integer minor units together with its value in
+    the base currency, converted with the cached FX rate table.
+    """
     try:
         logger.info(f"Creating transaction | cart_id={cart_id} | value={transaction_value} | currency={currency}")
 
-        transaction = Transaction(
-            cart_id=cart_id,
-            transaction_value=transaction_value,
-            currency=currency,
-            status="pending"
-        ).save()
+        fx_rates = get_fx_rates()
+        try:
+            currency = normalize_currency(currency)
+            amount_minor = to_minor_units(transaction_value, currency)
+            base_amount_minor, fx_rate = fx_rates.to_base_minor(amount_minor, currency)
+        except CurrencyError as err:
+            logger.warning(f"Invalid transaction amount | cart_id={cart_id} | {err}")
+            return {
+                "ok": False,
+                "error": "VALIDATION_ERROR",
+                "message": str(err)
+            }
+
+
+        with guarded_call(mongo_breaker):
+            transaction = Transaction(
+                cart_id=cart_id,
+                transaction_value=float(from_minor_units(amount_minor, currency)),
+                currency=currency,
+                amount_minor=amount_minor,
+                base_currency=fx_rates.base_currency,
+                base_amount_minor=base_amount_minor,
+                fx_rate=str(fx_rate),
+                status="pending"
+            ).save()
 
         log_db_operation("CREATE", "transactions", str(transaction.id))
         log_transaction_event(str(transaction.id), cart_id, "CREATED", "pending", transaction_value)
@@ -48,6 +176,20 @@ def create_transaction(cart_id, transaction_value, currency="dollar"):
             "error": "VALIDATION_ERROR",
             "message": str(err)
         }
+    except FxRateUnavailable as err:
+        log_error("create_transaction", err, {"cart_id": cart_id, "currency": currency})
+        return {
+            "ok": False,
+            "error": "FX_RATE_UNAVAILABLE",
+            "message": str(err)
+        }
+    except DependencyUnavailable as err:
+        log_error("create_transaction", err, {"cart_id": cart_id})
+        return {
+            "ok": False,
+            "error": err.code,
+            "message": str(err)
+        }
     except Exception as err:
         log_error("create_transaction", err, {"cart_id": cart_id})
         return {
@@ -59,11 +201,19 @@ def create_transaction(cart_id, transaction_value, currency="dollar"):
 def get_all_transactions():
     """Get all transactions"""
     try:
-        transactions = Transaction.objects()
+        with guarded_call(mongo_breaker):
+            transactions = [t.to_dict() for t in Transaction.objects.read_preference(read_preference_for('list'))]
         logger.debug(f"Retrieved all transactions | count={len(transactions)}")
         return {
             "ok": True,
-            "transactions": [t.to_dict() for t in transactions]
+            "transactions": transactions
+        }
+    except DependencyUnavailable as err:
+        log_error("get_all_transactions", err)
+        return {
+            "ok": False,
+            "error": err.code,
+            "message": str(err)
         }
     except Exception as err:
         log_error("get_all_transactions", err)
@@ -84,7 +234,9 @@ def get_transaction_by_id(transaction_id):
                 "message": "Invalid transaction ID format"
             }
 
-        transaction = Transaction.objects(id=transaction_id).first()
+        # stays on the primary by default so a read right after updateStatus is fresh
+        with guarded_call(mongo_breaker):
+            transaction = Transaction.objects(id=transaction_id).read_preference(read_preference_for('detail')).first()
 
         if not transaction:
             logger.warning(f"Transaction not found | transaction_id={transaction_id}")
@@ -99,6 +251,13 @@ def get_transaction_by_id(transaction_id):
             "ok": True,
             "transaction": transaction.to_dict()
         }
+    except DependencyUnavailable as err:
+        log_error("get_transaction_by_id", err, {"transaction_id": transaction_id})
+        return {
+            "ok": False,
+            "error": err.code,
+            "message": str(err)
+        }
     except Exception as err:
         log_error("get_transaction_by_id", err, {"transaction_id": transaction_id})
         return {
@@ -110,11 +269,19 @@ def get_transaction_by_id(transaction_id):
 def get_transactions_by_cart(cart_id):
     """Get all transactions for a specific cart"""
     try:
-        transactions = Transaction.objects(cart_id=cart_id)
+        with guarded_call(mongo_breaker):
+            transactions = [t.to_dict() for t in Transaction.objects(cart_id=cart_id).read_preference(read_preference_for('history'))]
         logger.debug(f"Retrieved transactions for cart | cart_id={cart_id} | count={len(transactions)}")
         return {
             "ok": True,
-            "transactions": [t.to_dict() for t in transactions]
+            "transactions": transactions
+        }
+    except DependencyUnavailable as err:
+        log_error("get_transactions_by_cart", err, {"cart_id": cart_id})
+        return {
+            "ok": False,
+            "error": err.code,
+            "message": str(err)
         }
     except Exception as err:
         log_error("get_transactions_by_cart", err, {"cart_id": cart_id})
@@ -135,7 +302,8 @@ def delete_transaction(transaction_id):
                 "message": "Invalid transaction ID format"
             }
 
-        transaction = Transaction.objects(id=transaction_id).first()
+        with guarded_call(mongo_breaker):
+            transaction = Transaction.objects(id=transaction_id).first()
 
         if not transaction:
             logger.warning(f"Transaction not found for deletion | transaction_id={transaction_id}")
@@ -146,7 +314,8 @@ def delete_transaction(transaction_id):
             }
 
         cart_id = transaction.cart_id
-        transaction.delete()
+        with guarded_call(mongo_breaker):
+            transaction.delete()
         logger.info(f"Transaction deleted | transaction_id={transaction_id} | cart_id={cart_id}")
         log_db_operation("DELETE", "transactions", transaction_id)
 
@@ -154,6 +323,13 @@ def delete_transaction(transaction_id):
             "ok": True,
             "message": "Transaction deleted successfully"
         }
+    except DependencyUnavailable as err:
+        log_error("delete_transaction", err, {"transaction_id": transaction_id})
+        return {
+            "ok": False,
+            "error": err.code,
+            "message": str(err)
+        }
     except Exception as err:
         log_error("delete_transaction", err, {"transaction_id": transaction_id})
         return {
@@ -203,7 +379,8 @@ def updateStatus(transaction_id, status, cart_id=None):
             }
 
         if status =="refunded":
-            transaction = Transaction.objects(id=transaction_id,cart_id=cart_id,status='completed').first()
+            with guarded_call(mongo_breaker):
+                transaction = Transaction.objects(id=transaction_id,cart_id=cart_id,status='completed').first()
             if not transaction:
                 logger.warning(f"Transaction not found or not completed to refund | transaction_id={transaction_id} | cart_id={cart_id}")
                 return {
@@ -212,7 +389,8 @@ def updateStatus(transaction_id, status, cart_id=None):
                     "message": "Transaction not found"
                 }
         else:
-            transaction = Transaction.objects(id=transaction_id,cart_id=cart_id,status='pending').first()
+            with guarded_call(mongo_breaker):
+                transaction = Transaction.objects(id=transaction_id,cart_id=cart_id,status='pending').first()
             if not transaction:
                 logger.warning(f"Transaction not found or not pending | transaction_id={transaction_id} | cart_id={cart_id}")
                 return {
@@ -221,31 +399,51 @@ def updateStatus(transaction_id, status, cart_id=None):
                     "message": "Transaction not found"
                 }
 
+        # one event slot per transaction, the previous event has to go out first
+        if transaction.pending_event:
+            logger.warning(f"Previous cart event not sent yet, status not changed | transaction_id={transaction_id} | pending_event={transaction.pending_event}")
+            return {
+                "ok": False,
+                "error": "EVENT_PENDING",
+                "message": f"{transaction.pending_event} for the previous status change has not been sent yet, retry later"
+            }
+
+        event = status_events.get(status)
+        # don't change the status if the cart event can't be sent right now,
+        # the client can simply retry
+        if event and broker_breaker.is_open():
+            logger.warning(f"Broker unavailable, status not changed | transaction_id={transaction_id} | status={status}")
+            return {
+                "ok": False,
+                "error": "DEPENDENCY_UNAVAILABLE",
+                "message": "broker is unavailable (circuit open)"
+            }
+
         old_status = transaction.status
         transaction.status = status
         transaction.updated_at = datetime.now()
-        transaction.save()
+        # the event is stored with the status change so it is never lost once the write is committed
+        transaction.pending_event = event
+        transaction.pending_event_at = datetime.now(timezone.utc) if event else None
+        with guarded_call(mongo_breaker):
+            transaction.save()
         log_transaction_event(transaction_id, cart_id, "STATUS_CHANGE", status, transaction.transaction_value)
         logger.info(f"Transaction status updated | transaction_id={transaction_id} | old_status={old_status} | new_status={status}")
 
-        # Handle status-specific actions
-        if status == "completed":
-            log_celery_task("cart.completeCheckout", [cart_id], "SENT")
-            celery.send_task('cart.completeCheckout', args=[cart_id])
-            logger.info(f"Sent cart.completeCheckout task | cart_id={cart_id}")
-        elif status == "failed":
-            log_celery_task("cart.unfreeze", [cart_id], "SENT")
-            celery.send_task('cart.unfreeze', args=[cart_id])
-            logger.info(f"Sent cart.unfreeze task | cart_id={cart_id}")
-        elif status == "refunded":
-            # Future implementation for refunds can be added here
-            logger.info(f"Refund process to be implemented | transaction_id={transaction_id}")
-            celery.send_task('cart.processRefund', args=[cart_id])
-            log_celery_task("cart.processRefund", [cart_id], "SENT")
+        message = f"Transaction status updated from '{old_status}' to '{status}'"
+        if event:
+            if status == "refunded":
+                # Future implementation for refunds can be added here
+                logger.info(f"Refund process to be implemented | transaction_id={transaction_id}")
+            if _publish_pending_event(transaction):
+                logger.info(f"Sent {event} task | cart_id={cart_id}")
+            else:
+                logger.warning(f"{event} queued for retry | transaction_id={transaction_id} | cart_id={cart_id}")
+                message += f", {event} will be sent once the broker is back"
 
         return {
             "ok": True,
-            "message": f"Transaction status updated from '{old_status}' to '{status}'",
+            "message": message,
             "transaction": transaction.to_dict()
         }
     except ValidationError as err:
@@ -255,6 +453,13 @@ def updateStatus(transaction_id, status, cart_id=None):
             "error": "VALIDATION_ERROR",
             "message": str(err)
         }
+    except DependencyUnavailable as err:
+        log_error("updateStatus", err, {"transaction_id": transaction_id, "status": status})
+        return {
+            "ok": False,
+            "error": err.code,
+            "message": str(err)
+        }
     except Exception as err:
         log_error("updateStatus", err, {"transaction_id": transaction_id, "status": status})
         return {
@@ -1,7 +1,18 @@
 """
 Utils package initialization
+
+The re-exports below need Flask, they are resolved on first access so that
+flask-free modules (logging_config, resilience, ...) can be imported without it.
 """
-from app.utils.decorators import validate_json
-from app.utils.error_handlers import register_error_handlers
 
 __all__ = ['validate_json', 'register_error_handlers']
+
+
+def __getattr__(name):
+    if name == 'validate_json':
+        from app.utils.decorators import validate_json
+        return validate_json
+    if name == 'register_error_handlers':
+        from app.utils.error_handlers import register_error_handlers
+        return register_error_handlers
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
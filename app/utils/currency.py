@@ -0,0 +1,89 @@
+"""
+ISO 4217 currency codes and money amount helpers
+
+Amounts are handled as Decimal and stored as integer minor units (cents for
+USD, no minor unit for JPY, ...) so totals never pick up float rounding.
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_EVEN
+
+# code -> number of minor unit digits
+ISO_4217 = {
+    'AED': 2, 'ARS': 2, 'AUD': 2, 'BGN': 2, 'BHD': 3, 'BRL': 2, 'CAD': 2,
+    'CHF': 2, 'CLP': 0, 'CNY': 2, 'COP': 2, 'CZK': 2, 'DKK': 2, 'DZD': 2,
+    'EGP': 2, 'EUR': 2, 'GBP': 2, 'HKD': 2, 'HUF': 2, 'IDR': 2, 'ILS': 2,
+    'INR': 2, 'ISK': 0, 'JOD': 3, 'JPY': 0, 'KRW': 0, 'KWD': 3, 'LYD': 3,
+    'MAD': 2, 'MXN': 2, 'MYR': 2, 'NOK': 2, 'NZD': 2, 'OMR': 3, 'PHP': 2,
+    'PLN': 2, 'QAR': 2, 'RON': 2, 'SAR': 2, 'SEK': 2, 'SGD': 2, 'THB': 2,
+    'TND': 3, 'TRY': 2, 'TWD': 2, 'UAH': 2, 'USD': 2, 'VND': 0, 'ZAR': 2,
+}
+
+# free text values accepted before currencies were validated
+LEGACY_ALIASES = {
+    'dollar': 'USD',
+    'dollars': 'USD',
+    'euro': 'EUR',
+    'euros': 'EUR',
+    'dinar': 'TND',
+}
+
+
+# how far (in minor units) a float may be off a whole minor unit
+_float_noise = Decimal('1e-9')
+
+
+class CurrencyError(ValueError):
+    """Raised for unknown currencies or amounts that don't fit the currency"""
+
+
+def normalize_currency(currency):
+    """
+    Turn a currency value into its ISO 4217 code.
+
+    Raises:
+        CurrencyError: the currency is not supported
+    """
+    if not isinstance(currency, str):
+        raise CurrencyError(f"Invalid currency: {currency!r}")
+    code = LEGACY_ALIASES.get(currency.strip().lower(), currency.strip().upper())
+    if code not in ISO_4217:
+        raise CurrencyError(f"Unsupported currency: {currency}")
+    return code
+
+
+def to_decimal(amount):
+    """Parse an amount without going through binary floats"""
+    try:
+        value = Decimal(str(amount))
+    except (InvalidOperation, ValueError, TypeError):
+        raise CurrencyError(f"Invalid amount: {amount!r}")
+    if not value.is_finite():
+        raise CurrencyError(f"Invalid amount: {amount!r}")
+    return value
+
+
+def to_minor_units(amount, currency):
+    """
+    Convert a major unit amount (e.g. 12.34 USD) to integer minor units (1234).
+
+    JSON numbers arrive as floats and carry binary noise like
+    0.30000000000000004, a float within 1e-9 of a whole minor unit is rounded
+    to it. Any other amount must be exact.
+
+    Raises:
+        CurrencyError: the amount has more decimals than the currency allows,
+            or a positive amount rounds to zero
+    """
+    value = to_decimal(amount)
+    minor = value.scaleb(ISO_4217[currency])
+    whole = minor.quantize(Decimal(1), rounding=ROUND_HALF_EVEN)
+    tolerance = _float_noise if isinstance(amount, float) else 0
+    if abs(minor - whole) > tolerance:
+        raise CurrencyError(f"{currency} amounts allow at most {ISO_4217[currency]} decimal places")
+    if value > 0 and whole == 0:
+        raise CurrencyError(f"Amount {amount} is below the smallest {currency} unit")
+    return int(whole)
+
+
+def from_minor_units(amount_minor, currency):
+    """Convert integer minor units back to a Decimal major unit amount"""
+    return Decimal(amount_minor).scaleb(-ISO_4217[currency])
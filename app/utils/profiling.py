@@ -0,0 +1,161 @@
+"""
+Opt-in request profiling and slow query capture
+
+- request profiling: a sampled fraction of requests, or privileged callers
+  sending X-Profile with the profiling token, are run under cProfile and the
+  stats are dumped to PROFILING_DIR
+- slow queries: a pymongo command listener keeps commands slower than
+  SLOW_QUERY_THRESHOLD_MS in a bounded ring buffer, exposed through the debug
+  endpoint
+"""
+import cProfile
+import hmac
+import os
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from flask import g, request, has_request_context
+from pymongo import monitoring
+from app.utils.logging_config import logger, log_warning
+
+# commands the driver runs for itself, not interesting here
+_ignored_commands = {'hello', 'ismaster', 'isMaster', 'ping', 'saslStart', 'saslContinue', 'endSessions', 'killCursors'}
+
+
+class SlowQueryRecorder(monitoring.CommandListener):
+    """Keeps the last N mongo commands that went over the threshold"""
+
+    def __init__(self, threshold_ms=100, max_entries=200):
+        self.threshold_ms = threshold_ms
+        self._entries = deque(maxlen=max_entries)
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        if event.command_name in _ignored_commands:
+            return
+        command = event.command
+        collection = command.get(event.command_name)
+        query_filter = command.get('filter') or command.get('q') or command.get('query') or {}
+        with self._lock:
+            # guard against events whose completion we never see
+            if len(self._pending) > 1000:
+                self._pending.clear()
+            self._pending[(event.connection_id, event.request_id)] = {
+                'collection': collection if isinstance(collection, str) else None,
+                # only the filter shape, values may hold customer data
+                'filter_keys': sorted(query_filter.keys()) if isinstance(query_filter, dict) else [],
+                'path': request.path if has_request_context() else None
+            }
+
+    def succeeded(self, event):
+        self._finish(event, reply=event.reply)
+
+    def failed(self, event):
+        self._finish(event, failure=event.failure)
+
+    def _finish(self, event, reply=None, failure=None):
+        with self._lock:
+            pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        if duration_ms < self.threshold_ms:
+            return
+
+        # command monitoring does not report docsExamined (that needs the
+        # database profiler or explain), the returned count is the closest
+        entry = dict(pending)
+        entry.update({
+            'command': event.command_name,
+            'duration_ms': round(duration_ms, 2),
+            'docs_returned': _docs_returned(reply),
+            'failed': failure is not None,
+            'at': datetime.now(timezone.utc).isoformat()
+        })
+        with self._lock:
+            self._entries.append(entry)
+        log_warning("slow_query", f"{event.command_name} took {entry['duration_ms']}ms", {"collection": entry['collection']})
+
+    def entries(self):
+        """Slowest recorded first"""
+        with self._lock:
+            entries = list(self._entries)
+        return sorted(entries, key=lambda e: e['duration_ms'], reverse=True)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _docs_returned(reply):
+    if not reply:
+        return None
+    cursor = reply.get('cursor')
+    if isinstance(cursor, dict):
+        return len(cursor.get('firstBatch', cursor.get('nextBatch', [])))
+    return reply.get('n')
+
+
+slow_query_recorder = None
+
+
+def init_slow_query_capture(config):
+    """
+    Register the slow query listener.
+
+    Has to run before the mongo connection is made, pymongo only picks up
+    global listeners when a client is created.
+    """
+    global slow_query_recorder
+    if slow_query_recorder is None:
+        slow_query_recorder = SlowQueryRecorder(
+            threshold_ms=config.get('SLOW_QUERY_THRESHOLD_MS', 100),
+            max_entries=config.get('SLOW_QUERY_BUFFER_SIZE', 200)
+        )
+        monitoring.register(slow_query_recorder)
+    return slow_query_recorder
+
+
+def is_privileged(app):
+    """Callers that send the profiling token may ask for profiles and see debug data"""
+    token = app.config.get('PROFILING_TOKEN')
+    if not token:
+        return False
+    return hmac.compare_digest(request.headers.get('X-Profile-Token', '').encode(), token.encode())
+
+
+def init_request_profiling(app):
+    """Register the request profiling hooks"""
+    sample_rate = app.config.get('PROFILING_SAMPLE_RATE', 0.0)
+    output_dir = app.config.get('PROFILING_DIR', 'profiles')
+
+    @app.before_request
+    def start_profiling():
+        requested = request.headers.get('X-Profile') and is_privileged(app)
+        if not requested and not (sample_rate and random.random() < sample_rate):
+            return
+        profiler = cProfile.Profile()
+        g.profiler = profiler
+        g.profile_started = time.perf_counter()
+        profiler.enable()
+
+    @app.teardown_request
+    def stop_profiling(exc):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return
+        profiler.disable()
+        elapsed_ms = (time.perf_counter() - g.pop('profile_started')) * 1000
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            name = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')}-{request.method}-{request.path.strip('/').replace('/', '_') or 'root'}.prof"
+            path = os.path.join(output_dir, name)
+            profiler.dump_stats(path)
+            logger.info(f"PROFILE  | {request.method} {request.path} | elapsed_ms={elapsed_ms:.1f} | file={path}")
+        except OSError as err:
+            log_warning("profiling", "Could not write profile", {"error": str(err)})
+
+    logger.info(f"Request profiling enabled | sample_rate={sample_rate} | output_dir={output_dir}")
@@ -0,0 +1,172 @@
+"""
+Admission control and per client rate limiting
+
+Two layers run before every request:
+- a global in-flight cap, requests over it are shed right away with a 503
+- a token bucket per (client, route), requests without a token get a 429
+
+Both responses carry a Retry-After header so well behaved clients back off.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from flask import jsonify, request, g
+from app.utils.logging_config import logger, log_warning
+
+
+class InMemoryBackend:
+    """Token buckets kept in process memory (per worker), least recently used buckets are evicted"""
+
+    def __init__(self, max_keys=10000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key, rate, burst):
+        """
+        Take one token from the bucket.
+
+        Returns:
+            (allowed, retry_after_seconds)
+        """
+        now = self._clock()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - last) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+
+class RedisBackend:
+    """Token buckets shared between workers/pods through Redis"""
+
+    # refill and take a token atomically, state is a hash {tokens, ts}
+    _script = """
+    local rate = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+    local allowed = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url, prefix='ratelimit'):
+        import redis
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url, socket_timeout=0.05, socket_connect_timeout=0.05)
+        self._acquire = self._client.register_script(self._script)
+
+    def acquire(self, key, rate, burst):
+        """
+        Take one token from the bucket.
+
+        Fails open if Redis is unreachable, the limiter should never be the
+        reason the service is down.
+
+        Returns:
+            (allowed, retry_after_seconds)
+        """
+        try:
+            allowed, tokens = self._acquire(keys=[f"{self.prefix}:{key}"], args=[rate, burst, time.time()])
+        except Exception as err:
+            log_warning("rate_limit", "Redis backend unavailable, allowing request", {"error": str(err)})
+            return True, 0
+        tokens = float(tokens)
+        return bool(allowed), 0 if allowed else (1 - tokens) / rate
+
+
+class InFlightLimiter:
+    """Caps the number of requests being handled at once in this process"""
+
+    def __init__(self, max_in_flight):
+        self.max_in_flight = max_in_flight
+        self._semaphore = threading.BoundedSemaphore(max_in_flight)
+
+    def try_enter(self):
+        return self._semaphore.acquire(blocking=False)
+
+    def leave(self):
+        self._semaphore.release()
+
+
+def get_client_id():
+    """
+    Identify the caller by remote address.
+
+    Client supplied headers are not trusted, a caller could pick a new id per
+    request. Behind a proxy wrap the app in werkzeug's ProxyFix so
+    remote_addr is the real client.
+    """
+    return request.remote_addr or 'unknown'
+
+
+def _too_many(status_code, message, retry_after):
+    response = jsonify({
+        'success': False,
+        'message': message
+    })
+    response.status_code = status_code
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def init_rate_limiting(app):
+    """Register the admission control hooks on the app"""
+    if not app.config.get('RATE_LIMIT_ENABLED', True):
+        logger.info("Rate limiting disabled")
+        return
+
+    if app.config.get('RATE_LIMIT_BACKEND') == 'redis':
+        backend = RedisBackend(app.config['RATE_LIMIT_REDIS_URL'])
+    else:
+        backend = InMemoryBackend()
+
+    limits = app.config.get('RATE_LIMITS', {})
+    default_limit = app.config.get('RATE_LIMIT_DEFAULT')
+    max_in_flight = app.config.get('MAX_IN_FLIGHT_REQUESTS')
+    in_flight = InFlightLimiter(max_in_flight) if max_in_flight else None
+
+    @app.before_request
+    def admit_request():
+        if in_flight:
+            if not in_flight.try_enter():
+                log_warning("admission", "In-flight cap reached, shedding request", {"path": request.path, "method": request.method})
+                return _too_many(503, 'Service overloaded, retry later', app.config.get('SHED_RETRY_AFTER', 1))
+            g.in_flight_admitted = True
+
+        route = f"{request.method} {request.url_rule.rule}" if request.url_rule else None
+        limit = limits.get(route, default_limit) if route else None
+        if not limit:
+            return None
+
+        rate, burst = limit
+        client_id = get_client_id()
+        allowed, retry_after = backend.acquire(f"{client_id}|{route}", rate, burst)
+        if not allowed:
+            log_warning("rate_limit", "Rate limit exceeded", {"client_id": client_id, "route": route})
+            return _too_many(429, 'Rate limit exceeded', retry_after)
+        return None
+
+    @app.teardown_request
+    def release_request(exc):
+        if g.pop('in_flight_admitted', False):
+            in_flight.leave()
+
+    logger.info(f"Rate limiting enabled | backend={type(backend).__name__} | max_in_flight={max_in_flight}")
@@ -0,0 +1,77 @@
+"""
+Per operation read preference routing for MongoDB queries
+"""
+import sys
+from pymongo.read_preferences import (
+    Primary,
+    PrimaryPreferred,
+    Secondary,
+    SecondaryPreferred,
+    Nearest
+)
+from app.config import Config, clamp_max_staleness
+from app.utils.logging_config import logger
+
+_modes = {
+    'primary': Primary,
+    'primaryPreferred': PrimaryPreferred,
+    'secondary': Secondary,
+    'secondaryPreferred': SecondaryPreferred,
+    'nearest': Nearest
+}
+
+_cache = {}
+
+
+def _routing_config():
+    """Settings of the running app when there is one, the base Config otherwise (Celery worker, CLI)"""
+    # no app context is possible if Flask was never imported, don't import it for the worker
+    flask = sys.modules.get('flask')
+    if flask is not None and flask.has_app_context():
+        return flask.current_app.config
+    return {key: getattr(Config, key) for key in ('MONGODB_READ_ROUTING', 'MONGODB_MAX_STALENESS_SECONDS', 'MONGODB_HEDGED_READS')}
+
+
+def reset_read_routing_cache():
+    """Drop cached read preferences"""
+    _cache.clear()
+
+
+def read_preference_for(operation: str):
+    """
+    Get the read preference to use for a given read operation.
+
+    Operations are looked up in MONGODB_READ_ROUTING of the app config,
+    anything unknown goes to the primary. Non primary modes get the max
+    staleness bound and, when enabled, hedged reads.
+
+    Args:
+        operation: Operation name (list, history, stats, detail, export)
+
+    Returns:
+        pymongo read preference instance
+    """
+    config = _routing_config()
+    mode = config.get('MONGODB_READ_ROUTING', {}).get(operation, 'primary')
+    max_staleness = clamp_max_staleness(config.get('MONGODB_MAX_STALENESS_SECONDS', -1))
+    hedged = config.get('MONGODB_HEDGED_READS', False)
+
+    key = (operation, mode, max_staleness, hedged)
+    if key in _cache:
+        return _cache[key]
+
+    if mode not in _modes:
+        logger.warning(f"Unknown read preference mode, falling back to primary | operation={operation} | mode={mode}")
+        mode = 'primary'
+
+    if mode == 'primary':
+        preference = Primary()
+    else:
+        kwargs = {'max_staleness': max_staleness}
+        if hedged:
+            kwargs['hedge'] = {'enabled': True}
+        preference = _modes[mode](**kwargs)
+
+    logger.debug(f"Read routing | operation={operation} | mode={mode}")
+    _cache[key] = preference
+    return preference
@@ -0,0 +1,184 @@
+"""
+Circuit breakers and request time budgets for calls to Mongo and the broker
+
+A route starts a time budget for the request (start_deadline), service code
+wraps every dependency call in guarded_call(breaker). A call fails fast with
+DependencyUnavailable when the breaker is open or the budget is spent, instead
+of waiting on driver timeouts and piling up worker threads.
+"""
+import threading
+import time
+from functools import lru_cache
+from contextlib import contextmanager
+from contextvars import ContextVar
+from app.config import Config
+from app.utils.logging_config import logger, log_warning
+
+_deadline = ContextVar('deadline', default=None)
+
+
+class DependencyUnavailable(Exception):
+    """Raised when a dependency call is refused or runs out of time"""
+
+    def __init__(self, dependency, code, message):
+        super().__init__(message)
+        self.dependency = dependency
+        self.code = code
+
+
+class CircuitBreaker:
+    """
+    Per dependency circuit breaker.
+
+    closed: calls go through, consecutive failures are counted
+    open: calls are refused until reset_timeout has passed
+    half-open: a single probe call is let through, success closes the
+    breaker and failure opens it again
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Check if a call may go through, moves open -> half-open once the reset timeout passed"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                logger.info(f"Circuit breaker half-open | dependency={self.name}")
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit breaker closed | dependency={self.name}")
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    log_warning("circuit_breaker", "Circuit breaker opened", {"dependency": self.name, "failures": self._failures})
+                self.state = self.OPEN
+                self._opened_at = self._clock()
+
+    def is_open(self):
+        """True while calls are being refused, does not use up the half-open probe"""
+        with self._lock:
+            return self.state == self.OPEN and self._clock() - self._opened_at < self.reset_timeout
+
+    def release_probe(self):
+        """Free the half-open probe slot without counting the call either way"""
+        with self._lock:
+            self._probe_in_flight = False
+
+
+# server error codes for failed/missing authentication
+_auth_error_codes = {13, 18}
+
+
+@lru_cache(maxsize=None)
+def _dependency_errors():
+    """Errors that mean the dependency itself is in trouble (not a bad query)"""
+    from pymongo.errors import ConnectionFailure, ExecutionTimeout, NetworkTimeout, ServerSelectionTimeoutError, WTimeoutError
+    from kombu.exceptions import OperationalError
+    return (ConnectionFailure, ExecutionTimeout, NetworkTimeout, ServerSelectionTimeoutError, WTimeoutError, OperationalError, TimeoutError)
+
+
+@lru_cache(maxsize=None)
+def _application_errors():
+    """Errors raised for the request itself, they show the dependency answered fine"""
+    from mongoengine.errors import DoesNotExist, FieldDoesNotExist, InvalidQueryError, MultipleObjectsReturned, NotUniqueError, ValidationError
+    return (DoesNotExist, FieldDoesNotExist, InvalidQueryError, MultipleObjectsReturned, NotUniqueError, ValidationError)
+
+
+def _is_dependency_failure(err):
+    from mongoengine.errors import OperationError
+    from pymongo.errors import OperationFailure, PyMongoError
+    # mongoengine wraps driver errors raised by save() in OperationError
+    if isinstance(err, OperationError) and isinstance(err.__cause__ or err.__context__, PyMongoError):
+        err = err.__cause__ or err.__context__
+    if isinstance(err, _dependency_errors()):
+        return True
+    if isinstance(err, OperationFailure) and err.code in _auth_error_codes:
+        return True
+    return isinstance(err, PyMongoError) and err.timeout
+
+
+mongo_breaker = CircuitBreaker('mongo', Config.MONGO_BREAKER_FAILURE_THRESHOLD, Config.MONGO_BREAKER_RESET_TIMEOUT)
+broker_breaker = CircuitBreaker('broker', Config.BROKER_BREAKER_FAILURE_THRESHOLD, Config.BROKER_BREAKER_RESET_TIMEOUT)
+
+
+def start_deadline(seconds):
+    """Start the time budget for the current request"""
+    _deadline.set(time.monotonic() + seconds if seconds else None)
+
+
+def clear_deadline():
+    _deadline.set(None)
+
+
+def remaining_budget():
+    """Seconds left in the current budget, None when no budget is set"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+@contextmanager
+def guarded_call(breaker):
+    """
+    Run a dependency call under a circuit breaker and the request budget.
+
+    Raises:
+        DependencyUnavailable: breaker open, budget spent, or the call failed
+            with a connection/timeout error
+    """
+    remaining = remaining_budget()
+    if remaining is not None and remaining <= 0:
+        raise DependencyUnavailable(breaker.name, "DEADLINE_EXCEEDED", f"Request time budget exhausted before calling {breaker.name}")
+    if not breaker.allow():
+        raise DependencyUnavailable(breaker.name, "DEPENDENCY_UNAVAILABLE", f"{breaker.name} is unavailable (circuit open)")
+
+    try:
+        if remaining is not None and breaker is mongo_breaker:
+            # ops in the block may use what is left of the request budget, server
+            # selection still gives up after serverSelectionTimeoutMS if that is shorter
+            import pymongo
+            with pymongo.timeout(remaining):
+                yield
+        else:
+            yield
+    except BaseException as err:
+        if _is_dependency_failure(err):
+            breaker.record_failure()
+            raise DependencyUnavailable(breaker.name, "DEPENDENCY_UNAVAILABLE", f"{breaker.name} call failed: {err}") from err
+        if isinstance(err, _application_errors()):
+            # validation, not found... the dependency answered fine
+            breaker.record_success()
+        else:
+            # anything else (bad query, bug) says nothing about the dependency health
+            breaker.release_probe()
+        raise
+    breaker.record_success()
@@ -2,8 +2,8 @@ from celery import Celery
 from mongoengine import connect
 import os
 import logging
-from dotenv import load_dotenv
-load_dotenv()
+# loads .env like the web app does, python-dotenv is only imported when one exists
+from app.config import Config  # noqa: F401
 
 # Set up logging for Celery worker
 logging.basicConfig(
@@ -20,10 +20,18 @@ celery = Celery(
     # tasks=['stock.unreserve_stock','stock.reserve_stock', 'stock.finalise_stock_purchase','transaction.create','cart.completeCheckout','cart.unfreeze'],
 )
 celery.conf.task_routes = {
+    # long running, keep it from holding up transaction.create
+    'transaction.export': {'queue': 'export_queue'},
     'transaction.*': {'queue': 'transaction_queue'},
     'cart.*': {'queue': 'cart_queue'},
     'stock.*': {'queue': 'stock_queue'},
 }
+celery.conf.beat_schedule = {
+    'publish-pending-events': {
+        'task': 'transaction.publishPendingEvents',
+        'schedule': int(os.getenv('PENDING_EVENTS_INTERVAL', 30)),
+    },
+}
 celery.autodiscover_tasks()
 
 
@@ -34,9 +42,14 @@ connect(
     password=os.getenv('MONGODB_PASSWORD'),
     host=os.getenv('MONGODB_HOST', 'localhost'),
     port=int(os.getenv('MONGODB_PORT', 27017)),
-    authentication_source=os.getenv('MONGODB_AUTH_SOURCE', 'devopsshowcase')
+    authentication_source=os.getenv('MONGODB_AUTH_SOURCE', 'devopsshowcase'),
+    serverSelectionTimeoutMS=int(os.getenv('MONGODB_SERVER_SELECTION_TIMEOUT_MS', 2000)),
+    connectTimeoutMS=int(os.getenv('MONGODB_CONNECT_TIMEOUT_MS', 2000)),
+    socketTimeoutMS=int(os.getenv('MONGODB_SOCKET_TIMEOUT_MS', 5000)),
+    connect=False,
+    **({'replicaset': os.getenv('MONGODB_REPLICA_SET')} if os.getenv('MONGODB_REPLICA_SET') else {})
 )
-logger.info(f"Transaction Celery worker connected to MongoDB")
+logger.info(f"Transaction Celery worker MongoDB client configured (connects on first use)")
 
 
 from app.services.transaction_service import create_transaction
@@ -56,4 +69,54 @@ def create_transaction_task(cart_id, transaction_value):
     return result
 
 
+from app.services.export_service import export_transactions
+@celery.task(name="transaction.export")
+def export_transactions_task(output_dir=None, export_format="csv", start_date=None, end_date=None, statuses=None,
+                             run_id=None, resume=True):
+    """
+    Export the transactions ledger to chunked CSV/Parquet files.
+
+    Dates are ISO strings since task args go through JSON. Without an
+    output_dir every run writes to its own EXPORT_DIR/<run_id> directory, a new
+    run_id is picked when none is given. Re-sending the task with the run_id
+    from the result (or the same output_dir) resumes from the last checkpoint,
+    resume=False starts over.
+    """
+    from datetime import datetime, timezone
+    if run_id and os.path.basename(run_id) != run_id:
+        return {"ok": False, "error": "VALIDATION_ERROR", "message": "run_id must not contain path separators"}
+    if not output_dir:
+        run_id = run_id or datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+        output_dir = os.path.join(os.getenv('EXPORT_DIR', 'exports'), run_id)
+    logger.info(f"TASK RECEIVED | transaction.export | output_dir={output_dir} | format={export_format} | resume={resume}")
+    result = export_transactions(
+        output_dir,
+        export_format=export_format,
+        chunk_size=int(os.getenv('EXPORT_CHUNK_SIZE', 100000)),
+        batch_size=int(os.getenv('EXPORT_BATCH_SIZE', 1000)),
+        start_date=datetime.fromisoformat(start_date) if start_date else None,
+        end_date=datetime.fromisoformat(end_date) if end_date else None,
+        statuses=statuses,
+        resume=resume
+    )
+    result["run_id"] = run_id
+    result["output_dir"] = output_dir
+    if result.get("ok"):
+        logger.info(f"TASK SUCCESS | transaction.export | rows={result.get('rows')} | chunks={result.get('chunks')}")
+    else:
+        logger.error(f"TASK FAILED | transaction.export | error={result.get('message')}")
+    return result
+
+
+from app.services.transaction_service import publish_pending_events
+@celery.task(name="transaction.publishPendingEvents")
+def publish_pending_events_task():
+    """
+    Send cart events that could not be published when the status changed.
 
+    Scheduled by celery beat every PENDING_EVENTS_INTERVAL seconds.
+    """
+    result = publish_pending_events()
+    if not result.get("ok"):
+        logger.error(f"TASK FAILED | transaction.publishPendingEvents | error={result.get('message')}")
+    return result
@@ -0,0 +1,31 @@
+"""
+Shared test fixtures
+"""
+import pytest
+from app import create_app
+
+
+@pytest.fixture
+def app():
+    """App built with the testing config, Mongo is never contacted (connect=False)"""
+    return create_app('testing')
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+class FakeClock:
+    """Monotonic clock stand-in, move time with clock.now += seconds"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
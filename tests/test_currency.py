@@ -0,0 +1,56 @@
+"""
+Tests for currency codes and minor unit amounts
+"""
+from decimal import Decimal
+import pytest
+from app.utils.currency import CurrencyError, from_minor_units, normalize_currency, to_minor_units
+
+
+def test_normalizes_codes_and_legacy_values():
+    assert normalize_currency('usd') == 'USD'
+    assert normalize_currency('dollar') == 'USD'
+    assert normalize_currency(' EUR ') == 'EUR'
+
+
+def test_rejects_unknown_currency():
+    with pytest.raises(CurrencyError):
+        normalize_currency('XYZ')
+
+
+def test_float_noise_is_rounded_away():
+    assert to_minor_units(0.1 + 0.2, 'USD') == 30
+    assert to_minor_units(1.1 * 3, 'USD') == 330
+    assert to_minor_units(10.0, 'JPY') == 10
+
+
+def test_floats_with_real_extra_precision_are_rejected():
+    with pytest.raises(CurrencyError):
+        to_minor_units(0.125, 'USD')
+    with pytest.raises(CurrencyError):
+        to_minor_units(12.3456, 'USD')
+
+
+def test_positive_amounts_never_round_to_zero():
+    with pytest.raises(CurrencyError):
+        to_minor_units(1e-12, 'USD')
+    assert to_minor_units(0.0, 'USD') == 0
+
+
+def test_exact_amounts_must_fit_the_currency():
+    assert to_minor_units('12.34', 'USD') == 1234
+    assert to_minor_units(Decimal('1.234'), 'TND') == 1234
+    with pytest.raises(CurrencyError):
+        to_minor_units('1.234', 'USD')
+    with pytest.raises(CurrencyError):
+        to_minor_units('1.5', 'JPY')
+
+
+def test_rejects_invalid_amounts():
+    for amount in ('abc', None, float('nan'), 'inf'):
+        with pytest.raises(CurrencyError):
+            to_minor_units(amount, 'USD')
+
+
+def test_round_trip():
+    assert from_minor_units(1234, 'USD') == Decimal('12.34')
+    assert from_minor_units(1234, 'KWD') == Decimal('1.234')
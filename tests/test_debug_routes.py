@@ -0,0 +1,37 @@
+"""
+Tests for the debug endpoints
+"""
+import pytest
+from app import create_app
+from app.config import TestingConfig
+
+
+def test_debug_routes_not_registered_by_default(client):
+    assert client.get('/api/debug/slow-queries').status_code == 404
+
+
+@pytest.fixture
+def debug_client(monkeypatch):
+    monkeypatch.setattr(TestingConfig, 'PROFILING_ENABLED', True)
+    monkeypatch.setattr(TestingConfig, 'PROFILING_TOKEN', 'secret')
+    return create_app('testing').test_client()
+
+
+def test_debug_routes_require_token(debug_client):
+    assert debug_client.get('/api/debug/slow-queries').status_code == 403
+    assert debug_client.get('/api/debug/slow-queries', headers={'X-Profile-Token': 'wrong'}).status_code == 403
+
+
+def test_debug_routes_with_token(debug_client):
+    response = debug_client.get('/api/debug/slow-queries', headers={'X-Profile-Token': 'secret'})
+
+    assert response.status_code == 200
+    assert response.json['slow_queries'] == []
+
+
+def test_empty_token_never_privileged(monkeypatch):
+    monkeypatch.setattr(TestingConfig, 'PROFILING_ENABLED', True)
+    monkeypatch.setattr(TestingConfig, 'PROFILING_TOKEN', '')
+    client = create_app('testing').test_client()
+
+    assert client.get('/api/debug/slow-queries', headers={'X-Profile-Token': ''}).status_code == 403
@@ -0,0 +1,148 @@
+"""
+Tests for the streaming ledger export
+"""
+import csv
+import json
+import os
+from datetime import datetime
+import pytest
+from bson import ObjectId
+from app.models.transaction import Transaction
+from app.services import export_service
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = docs
+        self._limit = None
+
+    def sort(self, key, direction):
+        self._docs = sorted(self._docs, key=lambda d: d[key], reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def batch_size(self, n):
+        return self
+
+    def __iter__(self):
+        return iter(self._docs[:self._limit])
+
+
+class FakeCollection:
+    """Just enough of a pymongo collection for keyset pagination on _id"""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def with_options(self, **kwargs):
+        return self
+
+    def find(self, query):
+        after = query.get('_id', {}).get('$gt')
+        statuses = query.get('status', {}).get('$in')
+        return FakeCursor([
+            d for d in self.docs
+            if (after is None or d['_id'] > after) and (statuses is None or d['status'] in statuses)
+        ])
+
+
+def _docs(n):
+    return [{
+        '_id': ObjectId(),
+        'cart_id': f"cart-{i}",
+        'transaction_value': 1.5,
+        'currency': 'USD',
+        'amount_minor': 150,
+        'base_currency': 'USD',
+        'base_amount_minor': 150,
+        'fx_rate': '1',
+        'created_at': datetime(2026, 1, 1),
+        'updated_at': datetime(2026, 1, 1),
+        'status': 'completed' if i % 2 else 'pending'
+    } for i in range(n)]
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    fake = FakeCollection(_docs(25))
+    monkeypatch.setattr(Transaction, '_get_collection', classmethod(lambda cls: fake))
+    return fake
+
+
+def _read_rows(output_dir):
+    rows = []
+    for name in sorted(os.listdir(output_dir)):
+        if name.startswith('transactions-'):
+            with open(os.path.join(output_dir, name)) as f:
+                rows.extend(csv.DictReader(f))
+    return rows
+
+
+def test_exports_all_rows_in_chunks(tmp_path, collection):
+    result = export_service.export_transactions(str(tmp_path), chunk_size=10, batch_size=3)
+
+    assert result["ok"]
+    assert result["rows"] == 25
+    assert result["chunks"] == 3
+    rows = _read_rows(tmp_path)
+    assert [r['id'] for r in rows] == [str(d['_id']) for d in collection.docs]
+
+
+def test_status_filter(tmp_path, collection):
+    result = export_service.export_transactions(str(tmp_path), chunk_size=10, statuses=['completed'])
+
+    assert result["rows"] == 12
+    assert {r['status'] for r in _read_rows(tmp_path)} == {'completed'}
+
+
+def test_resume_continues_from_checkpoint(tmp_path, collection):
+    all_docs = collection.docs
+    collection.docs = all_docs[:10]
+    export_service.export_transactions(str(tmp_path), chunk_size=10)
+    with open(tmp_path / export_service.CHECKPOINT_FILE) as f:
+        checkpoint = json.load(f)
+    checkpoint['done'] = False
+    with open(tmp_path / export_service.CHECKPOINT_FILE, 'w') as f:
+        json.dump(checkpoint, f)
+
+    collection.docs = all_docs
+    result = export_service.export_transactions(str(tmp_path), chunk_size=10)
+
+    assert result["rows"] == 25
+    assert len(_read_rows(tmp_path)) == 25
+
+
+def test_no_resume_removes_old_chunks(tmp_path, collection):
+    export_service.export_transactions(str(tmp_path), chunk_size=5)
+    collection.docs = collection.docs[:7]
+
+    result = export_service.export_transactions(str(tmp_path), chunk_size=5, resume=False)
+
+    assert result["chunks"] == 2
+    assert sorted(p for p in os.listdir(tmp_path) if p.startswith('transactions-')) == ['transactions-00000.csv', 'transactions-00001.csv']
+    assert len(_read_rows(tmp_path)) == 7
+
+
+def test_parquet_export(tmp_path, collection):
+    pq = pytest.importorskip('pyarrow.parquet')
+    result = export_service.export_transactions(str(tmp_path), export_format='parquet', chunk_size=10, batch_size=4)
+
+    assert result["rows"] == 25
+    assert pq.read_table(tmp_path / 'transactions-00000.parquet').num_rows == 10
+
+
+def test_rejects_unknown_format(tmp_path):
+    result = export_service.export_transactions(str(tmp_path), export_format='xlsx')
+
+    assert result["error"] == "VALIDATION_ERROR"
+
+
+def test_parquet_needs_pyarrow(tmp_path, monkeypatch):
+    monkeypatch.setattr(export_service, 'EXPORT_FORMATS', ['csv'])
+    result = export_service.export_transactions(str(tmp_path), export_format='parquet')
+
+    assert result["error"] == "VALIDATION_ERROR"
+    assert 'pyarrow' in result["message"]
@@ -0,0 +1,155 @@
+"""
+Tests for the file backed FX rate table, all offline
+"""
+import json
+import os
+import threading
+from decimal import Decimal
+import pytest
+from app.services.fx_rates import FxRateTable, FxRateUnavailable, refresh_fx_rates
+from app.utils.currency import CurrencyError
+
+
+def _write(path, rates, base='USD'):
+    path.write_text(json.dumps({'base': base, 'as_of': '2026-01-01', 'rates': rates}))
+
+
+@pytest.fixture
+def rates_file(tmp_path):
+    path = tmp_path / 'fx_rates.json'
+    _write(path, {'EUR': '1.0850', 'JPY': '0.0067', 'KWD': '3.26'})
+    return path
+
+
+@pytest.fixture
+def table(rates_file, clock):
+    return FxRateTable(str(rates_file), 'USD', ttl=60, clock=clock)
+
+
+def test_converts_to_base_minor_units(table):
+    assert table.to_base_minor(1234, 'EUR') == (1339, Decimal('1.0850'))
+    assert table.to_base_minor(500, 'JPY') == (335, Decimal('0.0067'))
+    # 3 decimal currency to 2 decimal base
+    assert table.to_base_minor(1000, 'KWD') == (326, Decimal('3.26'))
+    assert table.to_base_minor(999, 'USD') == (999, Decimal(1))
+
+
+def test_rounds_half_even(table):
+    # 0.50 EUR * 1.0850 = 0.5425 USD -> 54 cents, 1.50 EUR -> 1.6275 -> 163 cents
+    assert table.to_base_minor(50, 'EUR')[0] == 54
+    assert table.to_base_minor(150, 'EUR')[0] == 163
+
+
+def test_missing_rate_is_a_currency_error(table):
+    with pytest.raises(CurrencyError):
+        table.rate('BRL')
+
+
+def test_missing_file_is_unavailable(tmp_path):
+    with pytest.raises(FxRateUnavailable):
+        FxRateTable(str(tmp_path / 'missing.json')).rate('EUR')
+
+
+def test_reloads_changed_file_after_ttl(table, rates_file, clock):
+    table.rate('EUR')
+    _write(rates_file, {'EUR': '1.2'})
+    os.utime(rates_file, (0, 1))
+
+    assert table.rate('EUR') == Decimal('1.0850')
+    clock.now += 60
+    assert table.rate('EUR') == Decimal('1.2')
+
+
+@pytest.mark.parametrize('content', [
+    '{not json',
+    json.dumps({'base': 'EUR', 'rates': {'GBP': '1.1'}}),
+    json.dumps({'base': 'USD', 'rates': {'EUR': 'abc'}}),
+    json.dumps({'base': 'USD', 'rates': {'EUR': '-1'}}),
+    json.dumps({'base': 'USD', 'rates': {'XYZ': '1'}}),
+    json.dumps(['USD']),
+])
+def test_bad_file_keeps_last_good_table(table, rates_file, clock, content):
+    table.rate('EUR')
+    rates_file.write_text(content)
+    os.utime(rates_file, (0, 1))
+    clock.now += 60
+
+    assert table.rate('EUR') == Decimal('1.0850')
+
+
+def test_bad_file_without_previous_table_is_unavailable(rates_file):
+    rates_file.write_text('{not json')
+
+    with pytest.raises(FxRateUnavailable):
+        FxRateTable(str(rates_file)).rate('EUR')
+
+
+def test_refresh_replaces_file(tmp_path, rates_file):
+    source = tmp_path / 'remote.json'
+    _write(source, {'EUR': '1.1'})
+
+    result = refresh_fx_rates(source.as_uri(), str(rates_file), 'USD')
+
+    assert result["ok"]
+    assert json.loads(rates_file.read_text())['rates'] == {'EUR': '1.1'}
+
+
+def test_bad_download_keeps_file(tmp_path, rates_file):
+    source = tmp_path / 'remote.json'
+    _write(source, {'EUR': '1.1'}, base='EUR')
+
+    result = refresh_fx_rates(source.as_uri(), str(rates_file), 'USD')
+
+    assert not result["ok"]
+    assert json.loads(rates_file.read_text())['rates']['EUR'] == '1.0850'
+
+
+def test_table_refreshes_itself_from_url(tmp_path, rates_file, clock):
+    source = tmp_path / 'remote.json'
+    _write(source, {'EUR': '1.3'})
+    table = FxRateTable(str(rates_file), 'USD', ttl=60, url=source.as_uri(), refresh_interval=60, clock=clock)
+
+    table.rate('EUR')
+    for thread in threading.enumerate():
+        if thread.name == 'fx-rates-refresh':
+            thread.join()
+
+    assert table.rate('EUR') == Decimal('1.3')
+
+
+def test_refreshed_table_is_reloaded_even_with_same_mtime(table, rates_file):
+    table.rate('EUR')
+    mtime = os.path.getmtime(rates_file)
+    # coarse filesystem timestamps can leave the mtime unchanged
+    _write(rates_file, {'EUR': '1.2'})
+    os.utime(rates_file, (mtime, mtime))
+    table._reload = True
+
+    assert table.rate('EUR') == Decimal('1.2')
+
+
+def test_shipped_table_is_valid():
+    from app.config import Config
+    table = FxRateTable(Config.FX_RATES_FILE, Config.BASE_CURRENCY)
+
+    assert table.rate('EUR') > 0
+
+
+def test_currency_without_rate_is_rejected_as_400(client):
+    response = client.post('/api/transactions/', json={'cart_id': 'cart-1', 'transaction_value': 10, 'currency': 'BRL'})
+
+    assert response.status_code == 400
+    assert 'No FX rate for BRL' in response.json['message']
+
+
+def test_json_number_with_too_many_decimals_is_rejected(client):
+    response = client.post('/api/transactions/', json={'cart_id': 'cart-1', 'transaction_value': 12.345, 'currency': 'USD'})
+
+    assert response.status_code == 400
+    assert 'decimal places' in response.json['message']
+
+
+def test_amount_with_too_many_decimals_is_rejected(client):
+    response = client.post('/api/transactions/', json={'cart_id': 'cart-1', 'transaction_value': '1.234', 'currency': 'USD'})
+
+    assert response.status_code == 400
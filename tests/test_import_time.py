@@ -0,0 +1,46 @@
+"""
+Import time budget for the service layer
+
+Web and Celery workers autoscale, so importing the service layer must stay
+cheap: no Flask, no Celery client, no python-dotenv without a .env file.
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# cumulative import time of app.services.transaction_service, in microseconds
+# (about 0.25s today, 0.5s before the lazy imports)
+IMPORT_TIME_BUDGET_US = 400_000
+
+HEAVY_MODULES = ['flask', 'flask_cors', 'celery', 'kombu', 'redis', 'dotenv']
+
+
+def _run(code):
+    return subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+
+
+def test_service_import_within_budget():
+    result = _run("import app.services.transaction_service")
+
+    cumulative = [
+        int(line.split('|')[1])
+        for line in result.stderr.splitlines()
+        if line.startswith('import time:') and line.split('|')[2].strip() == 'app.services.transaction_service'
+    ]
+    assert cumulative, result.stderr[-2000:]
+    assert max(cumulative) < IMPORT_TIME_BUDGET_US
+
+
+def test_service_import_skips_heavy_modules():
+    modules = [m for m in HEAVY_MODULES if m != 'dotenv' or not os.path.exists(os.path.join(ROOT, '.env'))]
+    result = _run(
+        "import sys, app.services.transaction_service; "
+        f"print(','.join(m for m in {modules!r} if m in sys.modules))"
+    )
+
+    assert result.stdout.strip() == ''
@@ -0,0 +1,112 @@
+"""
+Tests for admission control and rate limiting
+"""
+from flask import Flask, jsonify
+from app.utils.rate_limiting import InMemoryBackend, InFlightLimiter, init_rate_limiting
+
+
+def test_bucket_allows_burst_then_refuses(clock):
+    backend = InMemoryBackend(clock=clock)
+
+    results = [backend.acquire('client|route', rate=1, burst=3)[0] for _ in range(4)]
+
+    assert results == [True, True, True, False]
+
+
+def test_bucket_refills_over_time(clock):
+    backend = InMemoryBackend(clock=clock)
+    for _ in range(2):
+        backend.acquire('k', rate=2, burst=2)
+
+    allowed, retry_after = backend.acquire('k', rate=2, burst=2)
+    assert not allowed
+    assert retry_after == 0.5
+
+    clock.now += 0.5
+    assert backend.acquire('k', rate=2, burst=2)[0]
+
+
+def test_buckets_are_per_key(clock):
+    backend = InMemoryBackend(clock=clock)
+    backend.acquire('a', rate=1, burst=1)
+
+    assert not backend.acquire('a', rate=1, burst=1)[0]
+    assert backend.acquire('b', rate=1, burst=1)[0]
+
+
+def test_evicts_least_recently_used(clock):
+    backend = InMemoryBackend(max_keys=2, clock=clock)
+    backend.acquire('a', rate=1, burst=1)
+    backend.acquire('b', rate=1, burst=1)
+    backend.acquire('a', rate=1, burst=1)
+    backend.acquire('c', rate=1, burst=1)
+
+    # 'b' was evicted, 'a' kept its empty bucket
+    assert not backend.acquire('a', rate=1, burst=1)[0]
+    assert list(backend._buckets) == ['c', 'a']
+
+
+def test_in_flight_limiter_caps_concurrency():
+    limiter = InFlightLimiter(1)
+
+    assert limiter.try_enter()
+    assert not limiter.try_enter()
+    limiter.leave()
+    assert limiter.try_enter()
+
+
+def _app(**config):
+    app = Flask(__name__)
+    app.config.update(RATE_LIMIT_ENABLED=True, RATE_LIMIT_BACKEND='memory', RATE_LIMITS={},
+                      RATE_LIMIT_DEFAULT=None, MAX_IN_FLIGHT_REQUESTS=None, SHED_RETRY_AFTER=1)
+    app.config.update(config)
+    init_rate_limiting(app)
+    return app
+
+
+def test_rate_limited_route_returns_429_with_retry_after():
+    app = _app(RATE_LIMITS={'GET /ping': (1, 1)})
+
+    @app.route('/ping')
+    def ping():
+        return jsonify({'success': True})
+
+    client = app.test_client()
+    assert client.get('/ping').status_code == 200
+    response = client.get('/ping')
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '1'
+
+
+def test_client_id_header_does_not_bypass_limit():
+    app = _app(RATE_LIMITS={'GET /ping': (1, 1)})
+
+    @app.route('/ping')
+    def ping():
+        return jsonify({'success': True})
+
+    client = app.test_client()
+    client.get('/ping', headers={'X-Client-Id': 'a'})
+    assert client.get('/ping', headers={'X-Client-Id': 'b'}).status_code == 429
+
+
+def test_in_flight_cap_sheds_with_503():
+    app = _app(MAX_IN_FLIGHT_REQUESTS=1)
+    client = app.test_client()
+    nested = {}
+
+    @app.route('/slow')
+    def slow():
+        # a second request arriving while this one is still being handled
+        nested['response'] = client.get('/fast')
+        return jsonify({'success': True})
+
+    @app.route('/fast')
+    def fast():
+        return jsonify({'success': True})
+
+    assert client.get('/slow').status_code == 200
+    assert nested['response'].status_code == 503
+    assert nested['response'].headers['Retry-After'] == '1'
+    # the slot is released once the request is done
+    assert client.get('/fast').status_code == 200
@@ -0,0 +1,90 @@
+"""
+Tests for per operation read preference routing
+"""
+from bson import ObjectId
+from pymongo.read_preferences import Primary, SecondaryPreferred, Nearest
+from app.config import clamp_max_staleness
+from app.services import transaction_service
+from app.utils.read_routing import read_preference_for, reset_read_routing_cache
+
+
+def setup_function():
+    reset_read_routing_cache()
+
+
+def test_defaults_outside_app_context():
+    assert isinstance(read_preference_for('list'), SecondaryPreferred)
+    assert isinstance(read_preference_for('detail'), Primary)
+    assert isinstance(read_preference_for('unknown'), Primary)
+
+
+def test_secondary_reads_get_max_staleness(app):
+    app.config['MONGODB_MAX_STALENESS_SECONDS'] = 120
+    with app.app_context():
+        preference = read_preference_for('history')
+    assert preference.max_staleness == 120
+
+
+def test_app_config_overrides_routing(app):
+    app.config['MONGODB_READ_ROUTING'] = {'list': 'nearest', 'detail': 'primary'}
+    with app.app_context():
+        assert isinstance(read_preference_for('list'), Nearest)
+        app.config['MONGODB_READ_ROUTING'] = {'list': 'primary'}
+        assert isinstance(read_preference_for('list'), Primary)
+
+
+def test_unknown_mode_falls_back_to_primary(app):
+    app.config['MONGODB_READ_ROUTING'] = {'list': 'secondaryish'}
+    with app.app_context():
+        assert isinstance(read_preference_for('list'), Primary)
+
+
+
+def test_max_staleness_is_clamped_to_what_the_driver_accepts(app):
+    assert clamp_max_staleness('-5') == -1
+    assert clamp_max_staleness(0) == 90
+    assert clamp_max_staleness(30) == 90
+    assert clamp_max_staleness(120) == 120
+
+    app.config['MONGODB_MAX_STALENESS_SECONDS'] = 10
+    with app.app_context():
+        assert read_preference_for('list').max_staleness == 90
+
+
+class RecordingObjects:
+    """Stands in for Transaction.objects, remembers the read preference of each query"""
+
+    def __init__(self):
+        self.preferences = []
+
+    def __call__(self, **query):
+        return self
+
+    def read_preference(self, preference):
+        self.preferences.append(preference)
+        return self
+
+    def first(self):
+        return None
+
+    def __iter__(self):
+        return iter([])
+
+
+def test_services_use_the_routed_read_preference(monkeypatch):
+    objects = RecordingObjects()
+
+    class FakeTransaction:
+        pass
+
+    FakeTransaction.objects = objects
+    monkeypatch.setattr(transaction_service, 'Transaction', FakeTransaction)
+
+    transaction_service.get_transaction_by_id(str(ObjectId()))
+    transaction_service.get_all_transactions()
+    transaction_service.get_transactions_by_cart('cart-1')
+
+    detail, listing, history = objects.preferences
+    assert isinstance(detail, Primary)
+    assert isinstance(listing, SecondaryPreferred)
+    assert isinstance(history, SecondaryPreferred)
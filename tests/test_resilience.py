@@ -0,0 +1,149 @@
+"""
+Tests for circuit breakers and the request time budget
+"""
+import pytest
+from mongoengine.errors import ValidationError
+from pymongo.errors import OperationFailure, ServerSelectionTimeoutError
+from app.utils import resilience
+from app.utils.resilience import CircuitBreaker, DependencyUnavailable, guarded_call
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker('test', failure_threshold=3, reset_timeout=10, clock=clock)
+
+
+def _fail(breaker, times):
+    for _ in range(times):
+        assert breaker.allow()
+        breaker.record_failure()
+
+
+def test_opens_after_threshold(breaker):
+    _fail(breaker, 2)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    _fail(breaker, 1)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_success_resets_failure_count(breaker):
+    _fail(breaker, 2)
+    breaker.record_success()
+    _fail(breaker, 2)
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_lets_one_probe_through(breaker, clock):
+    _fail(breaker, 3)
+    clock.now += 10
+
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+
+def test_successful_probe_closes(breaker, clock):
+    _fail(breaker, 3)
+    clock.now += 10
+    breaker.allow()
+    breaker.record_success()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens(breaker, clock):
+    _fail(breaker, 3)
+    clock.now += 10
+    breaker.allow()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.is_open()
+    clock.now += 9
+    assert not breaker.allow()
+
+
+def test_is_open_does_not_use_the_probe(breaker, clock):
+    _fail(breaker, 3)
+    clock.now += 10
+
+    assert not breaker.is_open()
+    assert breaker.allow()
+
+
+def test_guarded_call_counts_connection_errors(breaker):
+    for _ in range(3):
+        with pytest.raises(DependencyUnavailable) as exc:
+            with guarded_call(breaker):
+                raise ServerSelectionTimeoutError('down')
+        assert exc.value.code == 'DEPENDENCY_UNAVAILABLE'
+
+    with pytest.raises(DependencyUnavailable, match='circuit open'):
+        with guarded_call(breaker):
+            pass
+
+
+def test_guarded_call_counts_auth_failures(breaker):
+    with pytest.raises(DependencyUnavailable):
+        with guarded_call(breaker):
+            raise OperationFailure('auth failed', code=18)
+
+    assert breaker._failures == 1
+
+
+def test_application_errors_close_the_breaker(breaker, clock):
+    _fail(breaker, 3)
+    clock.now += 10
+
+    with pytest.raises(ValidationError):
+        with guarded_call(breaker):
+            raise ValidationError('bad value')
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_other_driver_errors_are_not_counted(breaker, clock):
+    _fail(breaker, 3)
+    clock.now += 10
+
+    with pytest.raises(OperationFailure):
+        with guarded_call(breaker):
+            raise OperationFailure('bad query', code=2)
+
+    # not a success, but the probe slot is free for the next call
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+
+
+def test_spent_budget_fails_fast(breaker):
+    resilience.start_deadline(0.001)
+    resilience._deadline.set(resilience._deadline.get() - 1)
+    try:
+        with pytest.raises(DependencyUnavailable) as exc:
+            with guarded_call(breaker):
+                pass
+    finally:
+        resilience.clear_deadline()
+
+    assert exc.value.code == 'DEADLINE_EXCEEDED'
+
+
+def test_mongo_ops_get_the_remaining_budget(monkeypatch):
+    import pymongo
+    seen = []
+    real_timeout = pymongo.timeout
+    monkeypatch.setattr(pymongo, 'timeout', lambda seconds: seen.append(seconds) or real_timeout(seconds))
+    monkeypatch.setattr(resilience, 'mongo_breaker', CircuitBreaker('mongo'))
+
+    resilience.start_deadline(30)
+    try:
+        with guarded_call(resilience.mongo_breaker):
+            pass
+    finally:
+        resilience.clear_deadline()
+
+    assert len(seen) == 1 and 29 < seen[0] <= 30
@@ -0,0 +1,134 @@
+"""
+Tests for updateStatus event publishing when the broker is unavailable
+"""
+import pytest
+from bson import ObjectId
+from app.services import transaction_service
+from app.utils.resilience import CircuitBreaker, DependencyUnavailable
+
+
+class FakeTransaction:
+    """Stands in for the Transaction document, one stored row"""
+
+    stored = None
+    updates = []
+
+    def __init__(self, **fields):
+        self.id = ObjectId()
+        self.cart_id = 'cart-1'
+        self.status = 'pending'
+        self.transaction_value = 10.0
+        self.pending_event = None
+        self.pending_event_at = None
+        self.saved = 0
+        self.__dict__.update(fields)
+
+    def save(self):
+        self.saved += 1
+        return self
+
+    def to_dict(self):
+        return {'id': str(self.id), 'status': self.status}
+
+    @classmethod
+    def objects(cls, **query):
+        stored = cls.stored
+
+        class QuerySet:
+            def first(self):
+                return stored if stored and stored.status == query.get('status', stored.status) else None
+
+            def update(self, **changes):
+                cls.updates.append((query, changes))
+
+        return QuerySet()
+
+
+@pytest.fixture
+def transaction(monkeypatch):
+    FakeTransaction.stored = FakeTransaction()
+    FakeTransaction.updates = []
+    monkeypatch.setattr(transaction_service, 'Transaction', FakeTransaction)
+    monkeypatch.setattr(transaction_service, 'mongo_breaker', CircuitBreaker('mongo'))
+    monkeypatch.setattr(transaction_service, 'broker_breaker', CircuitBreaker('broker', failure_threshold=1))
+    return FakeTransaction.stored
+
+
+def test_publishes_event_and_clears_it(transaction, monkeypatch):
+    sent = []
+    monkeypatch.setattr(transaction_service, '_send_task', lambda name, args: sent.append((name, args)))
+
+    result = transaction_service.updateStatus(str(transaction.id), 'completed', 'cart-1')
+
+    assert result["ok"]
+    assert sent == [('cart.completeCheckout', ['cart-1'])]
+    assert transaction.pending_event is None
+    assert FakeTransaction.updates[0][1] == {'unset__pending_event': True, 'unset__pending_event_at': True}
+
+
+def test_failed_publish_keeps_status_and_pending_event(transaction, monkeypatch):
+    def broker_down(name, args):
+        raise DependencyUnavailable('broker', 'DEPENDENCY_UNAVAILABLE', 'broker call failed')
+    monkeypatch.setattr(transaction_service, '_send_task', broker_down)
+
+    result = transaction_service.updateStatus(str(transaction.id), 'failed', 'cart-1')
+
+    assert result["ok"]
+    assert transaction.status == 'failed'
+    assert transaction.pending_event == 'cart.unfreeze'
+    assert transaction.pending_event_at is not None
+    assert "will be sent once the broker is back" in result["message"]
+
+
+def test_open_broker_breaker_refuses_before_writing(transaction):
+    transaction_service.broker_breaker.record_failure()
+
+    result = transaction_service.updateStatus(str(transaction.id), 'completed', 'cart-1')
+
+    assert result["error"] == "DEPENDENCY_UNAVAILABLE"
+    assert transaction.status == 'pending'
+    assert transaction.saved == 0
+
+
+def test_refuses_status_change_while_event_pending(transaction, monkeypatch):
+    transaction.status = 'completed'
+    transaction.pending_event = 'cart.completeCheckout'
+    monkeypatch.setattr(transaction_service, '_send_task', lambda name, args: None)
+
+    result = transaction_service.updateStatus(str(transaction.id), 'refunded', 'cart-1')
+
+    assert result["error"] == "EVENT_PENDING"
+    assert transaction.status == 'completed'
+    assert transaction.pending_event == 'cart.completeCheckout'
+    assert transaction.saved == 0
+
+
+def test_publish_pending_events_claims_old_events(transaction, monkeypatch):
+    transaction.status = 'completed'
+    transaction.pending_event = 'cart.completeCheckout'
+    sent = []
+    claims = []
+    monkeypatch.setattr(transaction_service, '_send_task', lambda name, args: sent.append(name))
+
+    class PendingQuerySet:
+        def __init__(self, query):
+            self.query = query
+
+        def modify(self, new=False, **changes):
+            claims.append((self.query, changes))
+            # the claimed event is gone from the next query once published
+            return transaction if transaction.pending_event else None
+
+        def update(self, **changes):
+            pass
+    monkeypatch.setattr(FakeTransaction, 'objects', classmethod(lambda cls, **query: PendingQuerySet(query)))
+
+    result = transaction_service.publish_pending_events()
+
+    assert result["published"] == 1
+    assert sent == ['cart.completeCheckout']
+    assert transaction.pending_event is None
+    query, changes = claims[0]
+    # only events older than the grace period, and the claim moves the timestamp
+    assert query['pending_event_at__lt'] < changes['set__pending_event_at']
+    assert (changes['set__pending_event_at'] - query['pending_event_at__lt']).total_seconds() == transaction_service.Config.PENDING_EVENT_GRACE_SECONDS